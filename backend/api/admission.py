@@ -0,0 +1,198 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+
+from .metrics import describe, inc, observe, register_collector
+
+# Admission control for the LLM-bound endpoints (see
+# middleware.AdmissionControlMiddleware). At most ADMISSION_MAX_IN_FLIGHT of
+# their requests run at once per process; up to ADMISSION_MAX_QUEUE more wait
+# in line, for at most ADMISSION_QUEUE_TIMEOUT seconds each, and anything
+# beyond that is turned away at once. A session gets one turn at a time.
+# Finished requests hand their slot straight to the longest waiter.
+#
+# Keep the in-flight limit plus the queue below the server's worker threads,
+# so requests for fast endpoints always find a free thread.
+
+
+class Rejected(Exception):
+    def __init__(self, reason, status, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.status = status
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """
+    A queued request: a threading.Event for sync callers, or a future on the
+    caller's event loop for async ones.
+    """
+
+    def __init__(self, loop=None):
+        self.granted = False
+        self.loop = loop
+        if loop is None:
+            self.event = threading.Event()
+        else:
+            self.future = loop.create_future()
+
+    def grant(self):
+        self.granted = True
+        if self.loop is None:
+            self.event.set()
+        else:
+            self.loop.call_soon_threadsafe(self._resolve)
+
+    def _resolve(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight, max_queue, queue_timeout):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters = deque()
+        self._sessions = set()  # sessions with a request running or queued
+        self._lock = threading.Lock()
+        # Moving average of how long admitted requests take, for Retry-After.
+        self._average_duration = 1.0
+
+    @property
+    def queue_depth(self):
+        return len(self._waiters)
+
+    def _retry_after(self):
+        waiting = len(self._waiters) + 1
+        return max(1, math.ceil(self._average_duration * waiting / max(1, self.max_in_flight)))
+
+    def _enter(self, session_key, loop):
+        """
+        Admits the request or queues it. Returns None when admitted, else the
+        waiter to wait on. Raises Rejected.
+        """
+        with self._lock:
+            if session_key is not None and session_key in self._sessions:
+                raise Rejected('session_busy', 429, 1)
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                if session_key is not None:
+                    self._sessions.add(session_key)
+                return None
+            if len(self._waiters) >= self.max_queue:
+                raise Rejected('queue_full', 503, self._retry_after())
+            waiter = _Waiter(loop)
+            self._waiters.append(waiter)
+            if session_key is not None:
+                self._sessions.add(session_key)
+            return waiter
+
+    def _finish_wait(self, waiter, session_key):
+        with self._lock:
+            if waiter.granted:
+                return
+            self._waiters.remove(waiter)
+            self._sessions.discard(session_key)
+            raise Rejected('queue_timeout', 503, self._retry_after())
+
+    def acquire(self, session_key=None):
+        """
+        Waits for a slot. Returns the time spent waiting; raises Rejected.
+        """
+        start = time.perf_counter()
+        waiter = self._enter(session_key, None)
+        if waiter is not None:
+            waiter.event.wait(self.queue_timeout)
+            self._finish_wait(waiter, session_key)
+        return time.perf_counter() - start
+
+    async def aacquire(self, session_key=None):
+        """
+        Async version of acquire; waiting suspends the coroutine.
+        """
+        start = time.perf_counter()
+        waiter = self._enter(session_key, asyncio.get_running_loop())
+        if waiter is not None:
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                self._abandon(waiter, session_key)
+                raise
+            self._finish_wait(waiter, session_key)
+        return time.perf_counter() - start
+
+    def _abandon(self, waiter, session_key):
+        """
+        Gives up a wait (the caller was cancelled): leaves the queue, or hands
+        on the slot if it was granted in the meantime.
+        """
+        with self._lock:
+            if not waiter.granted:
+                self._waiters.remove(waiter)
+                self._sessions.discard(session_key)
+                return
+        self.release(session_key)
+
+    def release(self, session_key=None, duration=None):
+        with self._lock:
+            if duration is not None:
+                self._average_duration = 0.8 * self._average_duration + 0.2 * duration
+            self._sessions.discard(session_key)
+            if self._waiters:
+                # The slot passes to the next waiter; in_flight is unchanged.
+                self._waiters.popleft().grant()
+            else:
+                self.in_flight -= 1
+
+
+# --- Metrics ---
+describe('visiontrack_admission_wait_seconds', 'histogram', "Time admitted LLM-bound requests waited in the queue.")
+describe('visiontrack_admission_rejected_total', 'counter', "LLM-bound requests turned away, by reason.")
+
+
+def record_admission(wait):
+    observe('visiontrack_admission_wait_seconds', wait)
+
+
+def record_rejection(reason):
+    inc('visiontrack_admission_rejected_total', reason=reason)
+
+
+_controller = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller():
+    global _controller
+    if _controller is None:
+        with _controller_lock:
+            if _controller is None:
+                _controller = AdmissionController(
+                    settings.ADMISSION_MAX_IN_FLIGHT,
+                    settings.ADMISSION_MAX_QUEUE,
+                    settings.ADMISSION_QUEUE_TIMEOUT,
+                )
+    return _controller
+
+
+def _admission_metrics():
+    controller = _controller
+    if controller is None:
+        return []
+    return [
+        ('visiontrack_admission_in_flight', 'gauge', "LLM-bound requests running.", [({}, controller.in_flight)]),
+        ('visiontrack_admission_queue_depth', 'gauge', "LLM-bound requests waiting for a slot.",
+         [({}, controller.queue_depth)]),
+    ]
+
+
+register_collector(_admission_metrics)
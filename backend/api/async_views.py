@@ -0,0 +1,146 @@
+import asyncio
+import io
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from . import views
+from .models import UserSession
+from .serializers import UserSessionSerializer, ChatMessageSerializer, ChatSendSerializer
+from .history import build_chat_history
+from .jobs import get_latest_job, roadmap_due
+from .llm_engine import achat_with_ai, agenerate_welcome_message
+from .metrics import span
+from .db_router import reads_from_replica
+from .groq_client import LLMUnavailable
+
+# Async counterparts of the LLM-bound views in views.py, served when the
+# project runs under ASGI with USE_ASYNC_VIEWS enabled. While a view awaits
+# Groq or YouTube, its event loop keeps serving other requests instead of
+# holding a worker thread. DRF's @api_view is sync-only, so these are plain
+# Django views that return the same JSON payloads.
+
+
+def _parse_json(request):
+    try:
+        return JSONParser().parse(io.BytesIO(request.body))
+    except ParseError:
+        return None
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def submit_questionnaire(request):
+    data = _parse_json(request)
+    if data is None:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON data received'}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = UserSessionSerializer(data=data)
+    if serializer.is_valid():
+        session = await sync_to_async(serializer.save)()
+
+        context = { "name": session.name, "status": session.status, "age": session.age }
+        # Cached per status and age, so a burst of sign-ups costs one LLM call.
+        welcome_message = await agenerate_welcome_message(context)
+
+        await sync_to_async(session.add_messages)(('ai', welcome_message))
+
+        return JsonResponse({
+            'success': True,
+            'session_id': session.session_id,
+        }, status=status.HTTP_201_CREATED)
+
+    return JsonResponse({'success': False, 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+
+@sync_to_async
+def _create_roadmap_reply(session, message_text):
+    """
+    Async wrapper around views._create_roadmap_reply (a single transaction).
+    """
+    return views._create_roadmap_reply(session, message_text)
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+async def send_message(request):
+    data = _parse_json(request)
+    if data is None:
+        return JsonResponse({'success': False, 'error': 'Invalid JSON data received'}, status=status.HTTP_400_BAD_REQUEST)
+    serializer = ChatSendSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse({'success': False, 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    session_id = serializer.validated_data['session_id']
+    message_text = serializer.validated_data['message']
+
+    try:
+        with span('db_session'):
+            session = await UserSession.objects.aget(session_id=session_id)
+    except UserSession.DoesNotExist:
+        return JsonResponse({'success': False, 'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if roadmap_due(session, message_text):
+        ai_message = await _create_roadmap_reply(session, message_text)
+    else:
+        with span('history'):
+            history_text = await sync_to_async(build_chat_history)(session)
+        context = { "name": session.name, "status": session.status, "age": session.age, "resume_hash": session.resume_hash, "resume_profile": session.resume_profile }
+
+        try:
+            ai_response_text = await achat_with_ai(context, message_text, history_text)
+        except LLMUnavailable as e:
+            response = JsonResponse(
+                {'success': False, 'error': 'The counselor is busy right now. Please try again shortly.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+            )
+            response['Retry-After'] = str(max(1, round(e.retry_after or 1)))
+            return response
+        with span('db_save'):
+            _, ai_message = await sync_to_async(session.add_messages)(('user', message_text), ('ai', ai_response_text))
+
+    return JsonResponse({
+        'success': True,
+        'ai_response': ChatMessageSerializer(ai_message).data
+    }, status=status.HTTP_201_CREATED)
+
+
+@require_http_methods(["GET"])
+@reads_from_replica
+async def get_roadmap(request, session_id):
+    """
+    Async version of views.get_roadmap. Long-polling with `?wait=` only
+    suspends this coroutine, so waiting clients don't hold worker threads.
+    """
+    try:
+        session = await UserSession.objects.aget(session_id=session_id)
+    except UserSession.DoesNotExist:
+        return JsonResponse({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    deadline = time.monotonic() + _roadmap_wait_seconds(request)
+    while True:
+        if session.roadmap_data:
+            return JsonResponse(session.roadmap_data, status=status.HTTP_200_OK, safe=False)
+        job = await sync_to_async(get_latest_job)(session)
+        if job is None:
+            return JsonResponse({'error': 'Roadmap not generated yet.'}, status=status.HTTP_404_NOT_FOUND)
+        if job.status == 'failed':
+            return JsonResponse({'status': 'failed', 'error': 'Roadmap generation failed.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if time.monotonic() >= deadline:
+            return JsonResponse({'status': 'pending'}, status=status.HTTP_202_ACCEPTED)
+        await asyncio.sleep(settings.ROADMAP_POLL_INTERVAL)
+        await session.arefresh_from_db(fields=['roadmap_data'])
+
+
+def _roadmap_wait_seconds(request):
+    try:
+        wait = float(request.GET.get('wait', 0))
+    except ValueError:
+        wait = 0
+    return max(0, min(wait, settings.ROADMAP_MAX_WAIT))
@@ -0,0 +1,56 @@
+import asyncio
+import functools
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Read routing for the read-only endpoints (chat history, roadmap). Views
+# wrapped in @reads_from_replica send their queries to the `replica` database
+# alias when one is configured (DATABASE_REPLICA_URL); everything else,
+# and every write, goes to `default`. Without a replica this is a no-op.
+
+REPLICA_ALIAS = 'replica'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def reads_from_replica(view):
+    """
+    Routes the reads a view makes to the replica. Works on sync and async views.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def async_wrapper(*args, **kwargs):
+            token = _use_replica.set(True)
+            try:
+                return await view(*args, **kwargs)
+            finally:
+                _use_replica.reset(token)
+        return async_wrapper
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _use_replica.set(True)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            _use_replica.reset(token)
+    return wrapper
+
+
+class ReadReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and REPLICA_ALIAS in settings.DATABASES:
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Schema changes reach the replica through replication.
+        return False if db == REPLICA_ALIAS else None
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from .metrics import record_cache_lookup
+from .models import ChunkEmbedding
+
+# Resumes built from the same templates, and re-uploads, share many chunks
+# word for word, and short chat messages ("yes", "tell me more") repeat
+# constantly. CachedEmbeddings wraps the real embeddings with:
+# - a table of chunk vectors keyed by the hash of model name and text, so
+#   only chunks never seen before are embedded;
+# - an in-process LRU of query vectors.
+
+# SQLite caps the number of query parameters; look keys up in batches.
+_LOOKUP_BATCH = 500
+
+
+def embedding_cache_key(model_name, text):
+    return hashlib.sha256(f"{model_name}\n{text}".encode('utf-8')).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    def __init__(self, embeddings, model_name, query_cache_size):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.query_cache_size = query_cache_size
+        self._queries = OrderedDict()  # text -> vector
+        self._queries_lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        texts = list(texts)
+        keys = [embedding_cache_key(self.model_name, text) for text in texts]
+        found = {}
+        unique_keys = list(dict.fromkeys(keys))
+        for start in range(0, len(unique_keys), _LOOKUP_BATCH):
+            rows = ChunkEmbedding.objects.filter(
+                cache_key__in=unique_keys[start:start + _LOOKUP_BATCH]
+            ).values_list('cache_key', 'vector')
+            for key, vector in rows:
+                found[key] = np.frombuffer(bytes(vector), dtype=np.float32).tolist()
+
+        missing = {}  # key -> text, for chunks not embedded before
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        for key in keys:
+            record_cache_lookup('chunk_embedding', 'hit' if key in found else 'miss')
+
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            new_rows = []
+            for key, vector in zip(missing, vectors):
+                found[key] = vector
+                new_rows.append(ChunkEmbedding(
+                    cache_key=key,
+                    model_name=self.model_name,
+                    vector=np.asarray(vector, dtype=np.float32).tobytes(),
+                ))
+            # Another worker may have stored some of the same chunks meanwhile.
+            ChunkEmbedding.objects.bulk_create(new_rows, ignore_conflicts=True)
+        return [found[key] for key in keys]
+
+    def embed_query(self, text):
+        with self._queries_lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+        if vector is not None:
+            record_cache_lookup('query_embedding', 'hit')
+            return vector
+
+        record_cache_lookup('query_embedding', 'miss')
+        vector = self.embeddings.embed_query(text)
+        with self._queries_lock:
+            self._queries[text] = vector
+            while len(self._queries) > self.query_cache_size:
+                self._queries.popitem(last=False)
+        return vector
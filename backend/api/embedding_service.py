@@ -0,0 +1,175 @@
+"""
+Local embedding service shared by all Django workers.
+
+One process holds the embedding model and listens on a Unix socket. Requests
+that arrive within a short window are merged into a single micro-batch, so
+concurrent uploads and chat turns cost one forward pass instead of many.
+
+Wire format, both directions: a 4-byte big-endian length followed by the
+payload. Requests are JSON `{"texts": [...]}`. Responses are an 8-byte header
+(count, dim as big-endian uint32) followed by count * dim float32 values; a
+count of ERROR_COUNT means the rest of the payload is a UTF-8 error message.
+"""
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+ERROR_COUNT = 0xFFFFFFFF
+_LENGTH = struct.Struct('>I')
+_HEADER = struct.Struct('>II')
+
+
+def _send_frame(sock, payload):
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    buf = bytearray()
+    while len(buf) < size:
+        chunk = sock.recv(size - len(buf))
+        if not chunk:
+            raise ConnectionError("Embedding service closed the connection.")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def _recv_frame(sock):
+    (length,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return _recv_exact(sock, length)
+
+
+# --- Server ---
+class _PendingRequest:
+    def __init__(self, texts):
+        self.texts = texts
+        self.vectors = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """
+    Collects texts from concurrent callers and embeds them in batches. A batch
+    is flushed when it reaches `max_batch` texts or `max_wait` seconds after
+    its first request arrived, whichever comes first.
+    """
+
+    def __init__(self, model, max_batch=64, max_wait=0.01):
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.batches = 0
+        self.texts_embedded = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='embedding-batcher', daemon=True)
+        self._thread.start()
+
+    def embed(self, texts):
+        request = _PendingRequest(texts)
+        self._queue.put(request)
+        request.done.wait()
+        if request.error:
+            raise request.error
+        return request.vectors
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            size = len(batch[0].texts)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(request)
+                size += len(request.texts)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        texts = [text for request in batch for text in request.texts]
+        try:
+            vectors = np.asarray(self.model.embed_documents(texts), dtype=np.float32)
+        except Exception as e:
+            for request in batch:
+                request.error = e
+                request.done.set()
+            return
+        self.batches += 1
+        self.texts_embedded += len(texts)
+        offset = 0
+        for request in batch:
+            request.vectors = vectors[offset:offset + len(request.texts)]
+            offset += len(request.texts)
+            request.done.set()
+
+
+class _EmbeddingRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            texts = json.loads(_recv_frame(self.request))['texts']
+            vectors = self.server.batcher.embed(texts) if texts else np.zeros((0, 0), dtype=np.float32)
+            count, dim = vectors.shape
+            _send_frame(self.request, _HEADER.pack(count, dim) + vectors.tobytes())
+        except ConnectionError:
+            return
+        except Exception as e:
+            _send_frame(self.request, _HEADER.pack(ERROR_COUNT, 0) + str(e).encode('utf-8'))
+
+
+class EmbeddingServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    # Every worker connects per call; a deep backlog absorbs upload bursts.
+    request_queue_size = 256
+
+    def __init__(self, socket_path, model, max_batch=64, max_wait=0.01):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        super().__init__(socket_path, _EmbeddingRequestHandler)
+        self.socket_path = socket_path
+        self.batcher = MicroBatcher(model, max_batch=max_batch, max_wait=max_wait)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+# --- Client ---
+class RemoteEmbeddings(Embeddings):
+    """
+    LangChain embeddings backed by the local embedding service. Drop-in
+    replacement for the in-process HuggingFaceEmbeddings object.
+    """
+
+    def __init__(self, socket_path, timeout=30.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _embed(self, texts):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            _send_frame(sock, json.dumps({'texts': texts}).encode('utf-8'))
+            payload = _recv_frame(sock)
+        count, dim = _HEADER.unpack_from(payload)
+        if count == ERROR_COUNT:
+            raise RuntimeError(f"Embedding service error: {payload[_HEADER.size:].decode('utf-8')}")
+        return np.frombuffer(payload, dtype=np.float32, offset=_HEADER.size).reshape(count, dim)
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self._embed([text])[0].tolist()
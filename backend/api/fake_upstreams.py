@@ -0,0 +1,190 @@
+import json
+import random
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Local stand-ins for the Groq chat-completions API and the YouTube search API,
+# for load tests that must not spend real quota or need network access. Point
+# GROQ_BASE_URL and YOUTUBE_API_ENDPOINT at the server to use them.
+
+WORDS = (
+    "career growth skills interests explore projects internship course data design "
+    "analysis research team goals experience learning opportunities industry role"
+).split()
+
+FAKE_ROADMAP = {
+    "roadmap": [
+        {
+            "title": title,
+            "skills": ["Communication", "Problem Solving"],
+            "courses_to_find": [f"{title} Fundamentals", f"{title} Projects"],
+            "salary": "Varies by region",
+            "growth": "Steady",
+            "reasoning": f"{title} matches the interests discussed in the conversation.",
+        }
+        for title in ("Data Analyst", "UX Designer", "Product Manager")
+    ]
+}
+
+FAKE_RESUME_PROFILE = {
+    "summary": "Final-year computer science student interested in data and software roles.",
+    "skills": ["Python", "SQL", "Git"],
+    "education": ["B.Tech Computer Science, Example University, 2021-2025"],
+    "experience": ["Data Analyst Intern, Example Corp: built reporting dashboards"],
+}
+
+
+class FakeUpstreamConfig:
+    def __init__(self, latency_ms=200.0, tokens_per_second=400.0, reply_tokens=80, youtube_latency_ms=80.0,
+                 requests_per_minute=0):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.reply_tokens = reply_tokens
+        self.youtube_latency_ms = youtube_latency_ms
+        # Completions quota, enforced with 429s like Groq's; 0 means none.
+        self.requests_per_minute = requests_per_minute
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            return self._send_json(404, {'error': {'message': 'Not found'}})
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        retry_after = self.server.take_request()
+        if retry_after:
+            return self._send_json(429, {'error': {'message': 'Rate limit reached for requests'}}, headers={
+                'retry-after': f"{retry_after:.2f}",
+                'x-ratelimit-remaining-requests': '0',
+                'x-ratelimit-reset-requests': f"{retry_after:.2f}s",
+            })
+        prompt = " ".join(str(message.get('content', '')) for message in body.get('messages', []))
+        config = self.server.config
+
+        if '"roadmap"' in prompt:
+            content = json.dumps(FAKE_ROADMAP)
+        elif body.get('response_format', {}).get('type') == 'json_object':
+            content = json.dumps(FAKE_RESUME_PROFILE)
+        else:
+            max_tokens = min(body.get('max_tokens') or config.reply_tokens, config.reply_tokens)
+            content = " ".join(random.choice(WORDS) for _ in range(max_tokens))
+        tokens = content.split(" ")
+        usage = {
+            'prompt_tokens': len(prompt) // 4,
+            'completion_tokens': len(tokens),
+            'total_tokens': len(prompt) // 4 + len(tokens),
+        }
+
+        time.sleep(config.latency_ms / 1000)
+        if body.get('stream'):
+            return self._stream_completion(body, tokens, usage)
+
+        # Generation time grows with the reply length, like the real service.
+        time.sleep(len(tokens) / config.tokens_per_second)
+        self._send_json(200, {
+            'id': f"chatcmpl-{uuid.uuid4().hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake-model'),
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop',
+            }],
+            'usage': usage,
+        })
+
+    def _stream_completion(self, body, tokens, usage):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        for i, token in enumerate(tokens):
+            time.sleep(1 / self.server.config.tokens_per_second)
+            chunk = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': body.get('model', 'fake-model'),
+                'choices': [{
+                    'index': 0,
+                    'delta': {'content': token if i == 0 else f" {token}"},
+                    'finish_reason': 'stop' if i == len(tokens) - 1 else None,
+                }],
+            }
+            if i == len(tokens) - 1:
+                chunk['x_groq'] = {'usage': usage}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n")
+        self._write_chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_GET(self):
+        if not self.path.startswith('/youtube/v3/search'):
+            return self._send_json(404, {'error': {'message': 'Not found'}})
+        time.sleep(self.server.config.youtube_latency_ms / 1000)
+        video_id = uuid.uuid4().hex[:11]
+        self._send_json(200, {
+            'items': [{
+                'id': {'kind': 'youtube#video', 'videoId': video_id},
+                'snippet': {'title': f"Fake course {video_id}"},
+            }]
+        })
+
+    def _write_chunk(self, text):
+        data = text.encode('utf-8')
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, config):
+        super().__init__(address, FakeUpstreamHandler)
+        self.config = config
+        self._request_times = deque()
+        self._quota_lock = threading.Lock()
+
+    def take_request(self):
+        """
+        Counts a completion request against the per-minute quota. Returns 0
+        if it is allowed, otherwise the seconds until a slot frees up.
+        """
+        if not self.config.requests_per_minute:
+            return 0
+        now = time.monotonic()
+        with self._quota_lock:
+            while self._request_times and self._request_times[0] <= now - 60:
+                self._request_times.popleft()
+            if len(self._request_times) >= self.config.requests_per_minute:
+                return self._request_times[0] + 60 - now
+            self._request_times.append(now)
+            return 0
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start_in_background(self):
+        thread = threading.Thread(target=self.serve_forever, name='fake-upstreams', daemon=True)
+        thread.start()
+        return thread
@@ -0,0 +1,364 @@
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+
+import httpx
+from django.conf import settings
+from groq import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+from .metrics import describe, inc, span
+
+try:
+    import fcntl
+except ImportError:  # Windows: the limiter falls back to per-process state.
+    fcntl = None
+
+# Every Groq call goes through create_chat_completion (or its async twin),
+# which:
+# - waits for the shared rate limiter before sending,
+# - gives the call a deadline, passed down as the HTTP timeout,
+# - retries 429s, timeouts, connection errors and 5xx responses with
+#   jittered exponential backoff, honouring Retry-After,
+# - feeds Groq's x-ratelimit-* headers back into the limiter.
+#
+# The limiter is a pair of token buckets (requests/minute and tokens/minute)
+# kept in a small file under an flock, so all workers on a host draw from
+# the same budget. When one worker is told to back off, all of them do. At
+# the quota ceiling, requests queue at the limit instead of burning
+# attempts on 429s.
+
+
+class LLMUnavailable(Exception):
+    """
+    Groq couldn't be reached in time, or kept rate limiting us. Views turn
+    this into a 503 with Retry-After.
+    """
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def build_http_client():
+    """
+    An httpx client with an explicit, keep-alive connection pool for the
+    Groq SDK to reuse across calls.
+    """
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=settings.GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.GROQ_MAX_CONNECTIONS,
+            keepalive_expiry=60,
+        ),
+        timeout=settings.GROQ_TIMEOUT,
+    )
+
+
+def build_async_http_client():
+    return httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.GROQ_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.GROQ_MAX_CONNECTIONS,
+            keepalive_expiry=60,
+        ),
+        timeout=settings.GROQ_TIMEOUT,
+    )
+
+
+# --- Rate Limiter ---
+_DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+
+def parse_reset_duration(value):
+    """
+    Parses Groq's reset durations ("7.66s", "2m59.56s", "120ms") to seconds.
+    """
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class RateLimiter:
+    """
+    Token buckets for requests and tokens per minute, shared between
+    processes through a state file. A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, path, requests_per_minute, tokens_per_minute):
+        self.path = path
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._local_state = None
+        self._local_lock = threading.Lock()
+
+    def _update(self, change):
+        """
+        Runs `change(state, now)` on the current state under the lock, saves
+        the state and returns what `change` returned.
+        """
+        now = time.time()
+        if fcntl is None:
+            with self._local_lock:
+                state = self._refill(self._local_state, now)
+                result = change(state, now)
+                self._local_state = state
+                return result
+
+        with open(self.path, 'a+') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or 'null')
+                except ValueError:
+                    state = None
+                state = self._refill(state, now)
+                result = change(state, now)
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(state))
+                f.flush()
+                return result
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _refill(self, state, now):
+        if not state:
+            return {
+                'requests': self.requests_per_minute,
+                'tokens': self.tokens_per_minute,
+                'updated': now,
+                'blocked_until': 0,
+            }
+        elapsed = max(0.0, now - state['updated'])
+        state['requests'] = min(self.requests_per_minute, state['requests'] + elapsed * self.requests_per_minute / 60)
+        state['tokens'] = min(self.tokens_per_minute, state['tokens'] + elapsed * self.tokens_per_minute / 60)
+        state['updated'] = now
+        return state
+
+    def try_acquire(self, tokens):
+        """
+        Takes one request and `tokens` tokens if both are available. Returns
+        0 on success, otherwise the seconds to wait before trying again.
+        """
+        # A call bigger than the whole bucket waits for a full bucket.
+        tokens = min(tokens, self.tokens_per_minute)
+
+        def change(state, now):
+            waits = [state['blocked_until'] - now]
+            if self.requests_per_minute and state['requests'] < 1:
+                waits.append((1 - state['requests']) * 60 / self.requests_per_minute)
+            if self.tokens_per_minute and state['tokens'] < tokens:
+                waits.append((tokens - state['tokens']) * 60 / self.tokens_per_minute)
+            wait = max(waits)
+            if wait > 0:
+                return wait
+            if self.requests_per_minute:
+                state['requests'] -= 1
+            if self.tokens_per_minute:
+                state['tokens'] -= tokens
+            return 0
+
+        return self._update(change)
+
+    def reconcile(self, estimated, actual):
+        """
+        Corrects the token bucket once a call's real usage is known.
+        """
+        if not self.tokens_per_minute or actual is None:
+            return
+
+        def change(state, now):
+            state['tokens'] = min(self.tokens_per_minute, state['tokens'] + min(estimated, self.tokens_per_minute) - actual)
+
+        self._update(change)
+
+    def observe_headers(self, headers):
+        """
+        Applies Groq's rate-limit headers. The buckets are only ever lowered
+        to what Groq reports remaining, and a 429's Retry-After pauses every
+        worker sharing this limiter.
+        """
+        retry_after = parse_reset_duration(headers.get('retry-after'))
+        remaining_requests = headers.get('x-ratelimit-remaining-requests')
+        remaining_tokens = headers.get('x-ratelimit-remaining-tokens')
+        reset_requests = parse_reset_duration(headers.get('x-ratelimit-reset-requests'))
+        reset_tokens = parse_reset_duration(headers.get('x-ratelimit-reset-tokens'))
+
+        def change(state, now):
+            if retry_after:
+                state['blocked_until'] = max(state['blocked_until'], now + retry_after)
+            if remaining_requests is not None and remaining_requests.isdigit():
+                state['requests'] = min(state['requests'], int(remaining_requests))
+                if int(remaining_requests) == 0 and reset_requests:
+                    state['blocked_until'] = max(state['blocked_until'], now + reset_requests)
+            if remaining_tokens is not None and remaining_tokens.isdigit():
+                state['tokens'] = min(state['tokens'], int(remaining_tokens))
+                if int(remaining_tokens) == 0 and reset_tokens:
+                    state['blocked_until'] = max(state['blocked_until'], now + reset_tokens)
+
+        if retry_after or remaining_requests is not None or remaining_tokens is not None:
+            self._update(change)
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter(
+                    settings.GROQ_RATE_LIMIT_FILE,
+                    settings.GROQ_REQUESTS_PER_MINUTE,
+                    settings.GROQ_TOKENS_PER_MINUTE,
+                )
+    return _limiter
+
+
+# --- Calls ---
+describe('visiontrack_groq_retries_total', 'counter', "Groq calls retried, by reason.")
+
+RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+def _backoff(attempt, error):
+    """
+    Seconds to wait before retrying: Retry-After when Groq sent one,
+    otherwise exponential backoff, with full jitter either way so workers
+    that failed together don't retry together.
+    """
+    retry_after = None
+    response = getattr(error, 'response', None)
+    if response is not None:
+        retry_after = parse_reset_duration(response.headers.get('retry-after'))
+    base = retry_after or settings.GROQ_RETRY_BASE_DELAY * 2 ** attempt
+    return base + random.uniform(0, base)
+
+
+def _retry_reason(error):
+    return 'rate_limited' if isinstance(error, RateLimitError) else type(error).__name__
+
+
+def _estimate_tokens(kwargs):
+    prompt_chars = sum(len(str(message.get('content', ''))) for message in kwargs.get('messages', []))
+    return (prompt_chars + 3) // 4 + (kwargs.get('max_tokens') or 0)
+
+
+def _usage_tokens(usage):
+    return getattr(usage, 'total_tokens', None) if usage is not None else None
+
+
+def create_chat_completion(client, **kwargs):
+    """
+    client.chat.completions.create(**kwargs), rate limited and retried
+    within a GROQ_TIMEOUT deadline. Streams are returned as a generator of
+    chunks. Raises LLMUnavailable when the deadline passes.
+    """
+    limiter = get_rate_limiter()
+    estimated = _estimate_tokens(kwargs)
+    deadline = time.monotonic() + settings.GROQ_TIMEOUT
+    last_error = None
+
+    for attempt in range(settings.GROQ_MAX_RETRIES + 1):
+        with span('groq_rate_limit_wait'):
+            while True:
+                wait = limiter.try_acquire(estimated)
+                if wait <= 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    raise LLMUnavailable("Groq rate limit budget exhausted.", retry_after=wait)
+                time.sleep(wait)
+
+        remaining = deadline - time.monotonic()
+        try:
+            raw = client.chat.completions.with_raw_response.create(timeout=remaining, **kwargs)
+        except RETRYABLE_ERRORS as e:
+            last_error = e
+            if getattr(e, 'response', None) is not None:
+                limiter.observe_headers(e.response.headers)
+            # The request didn't run; give its tokens back.
+            limiter.reconcile(estimated, 0)
+            inc('visiontrack_groq_retries_total', reason=_retry_reason(e))
+            delay = _backoff(attempt, e)
+            if attempt == settings.GROQ_MAX_RETRIES or time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+            continue
+
+        limiter.observe_headers(raw.headers)
+        completion = raw.parse()
+        if kwargs.get('stream'):
+            return _reconciled_stream(completion, limiter, estimated)
+        limiter.reconcile(estimated, _usage_tokens(completion.usage))
+        return completion
+
+    raise LLMUnavailable(f"Groq call failed: {last_error}", retry_after=settings.GROQ_RETRY_BASE_DELAY * 4)
+
+
+def _reconciled_stream(stream, limiter, estimated):
+    usage = None
+    for chunk in stream:
+        x_groq = getattr(chunk, 'x_groq', None)
+        if x_groq is not None and getattr(x_groq, 'usage', None) is not None:
+            usage = x_groq.usage
+        yield chunk
+    limiter.reconcile(estimated, _usage_tokens(usage))
+
+
+async def acreate_chat_completion(client, **kwargs):
+    """
+    Async version of create_chat_completion (non-streaming only). The
+    limiter's state is a locked file shared across processes, so its calls
+    run in a worker thread, and limiter waits suspend the coroutine; neither
+    blocks the event loop.
+    """
+    limiter = get_rate_limiter()
+    estimated = _estimate_tokens(kwargs)
+    deadline = time.monotonic() + settings.GROQ_TIMEOUT
+    last_error = None
+
+    for attempt in range(settings.GROQ_MAX_RETRIES + 1):
+        with span('groq_rate_limit_wait'):
+            while True:
+                wait = await asyncio.to_thread(limiter.try_acquire, estimated)
+                if wait <= 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    raise LLMUnavailable("Groq rate limit budget exhausted.", retry_after=wait)
+                await asyncio.sleep(wait)
+
+        remaining = deadline - time.monotonic()
+        try:
+            raw = await client.chat.completions.with_raw_response.create(timeout=remaining, **kwargs)
+        except RETRYABLE_ERRORS as e:
+            last_error = e
+            if getattr(e, 'response', None) is not None:
+                await asyncio.to_thread(limiter.observe_headers, e.response.headers)
+            await asyncio.to_thread(limiter.reconcile, estimated, 0)
+            inc('visiontrack_groq_retries_total', reason=_retry_reason(e))
+            delay = _backoff(attempt, e)
+            if attempt == settings.GROQ_MAX_RETRIES or time.monotonic() + delay > deadline:
+                break
+            await asyncio.sleep(delay)
+            continue
+
+        await asyncio.to_thread(limiter.observe_headers, raw.headers)
+        completion = await raw.parse()
+        await asyncio.to_thread(limiter.reconcile, estimated, _usage_tokens(completion.usage))
+        return completion
+
+    raise LLMUnavailable(f"Groq call failed: {last_error}", retry_after=settings.GROQ_RETRY_BASE_DELAY * 4)
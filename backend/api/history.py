@@ -0,0 +1,45 @@
+from django.conf import settings
+
+from .models import ChatMessage
+from .llm_engine import estimate_tokens, summarize_conversation
+
+SENDER_LABELS = dict(ChatMessage.SENDER_CHOICES)
+
+
+def format_transcript(messages):
+    """
+    Formats (sender, message) pairs the way prompts expect them.
+    """
+    return "\n".join([f"{SENDER_LABELS.get(sender, sender)}: {message}" for sender, message, *_ in messages])
+
+
+def build_chat_history(session):
+    """
+    Returns the conversation history for a chat prompt: the running summary of
+    older turns followed by the unsummarized messages verbatim.
+
+    When the messages older than the last HISTORY_RECENT_MESSAGES add up to
+    HISTORY_SUMMARY_TRIGGER_TOKENS, they are folded into the session's summary
+    first, so the verbatim tail stays short as the conversation grows.
+    """
+    messages = ChatMessage.objects.filter(session=session)
+    if session.summarized_until:
+        messages = messages.filter(timestamp__gt=session.summarized_until)
+    messages = list(messages.order_by("timestamp").values_list("sender", "message", "timestamp"))
+
+    recent_count = settings.HISTORY_RECENT_MESSAGES
+    older, recent = messages[:-recent_count], messages[-recent_count:]
+    if older and estimate_tokens(format_transcript(older)) >= settings.HISTORY_SUMMARY_TRIGGER_TOKENS:
+        try:
+            session.history_summary = summarize_conversation(session.history_summary, format_transcript(older))
+            session.summarized_until = older[-1][2]
+            session.save(update_fields=['history_summary', 'summarized_until'])
+            messages = recent
+        except Exception as e:
+            # Fall back to the verbatim history; the prompt budget still caps it.
+            print(f"Error summarizing conversation history: {e}")
+
+    history = format_transcript(messages)
+    if session.history_summary:
+        history = f"Summary of the earlier conversation: {session.history_summary}\n{history}"
+    return history
@@ -0,0 +1,133 @@
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ChatMessage, RoadmapJob
+from .history import format_transcript
+from .llm_engine import generate_career_roadmap
+
+# A small job queue for roadmap generation, kept in the database so it needs
+# no separate broker. Views enqueue jobs and return immediately; one or more
+# `manage.py run_roadmap_worker` processes claim and run them.
+
+ACTIVE_STATUSES = RoadmapJob.ACTIVE_STATUSES
+
+ROADMAP_READY_MESSAGE = "Oops! You've reached the message limit for this session. We've had a great conversation! I'm preparing a personalized career roadmap for you based on everything we've discussed. You can access it here: [View Your Roadmap](/roadmap/{session_id})"
+
+
+def roadmap_due(session, message_text):
+    """
+    Whether this turn should trigger roadmap generation: the user asked for it,
+    or the message limit is reached, and no roadmap exists yet.
+    """
+    # Check if the user is explicitly asking for the roadmap
+    user_wants_roadmap = 'roadmap' in message_text.lower() or 'career plan' in message_text.lower()
+    # The counter doesn't include the message being handled yet.
+    limit_reached = session.message_count + 1 >= 20
+    return (limit_reached or user_wants_roadmap) and not session.roadmap_data
+
+
+def enqueue_roadmap_job(session):
+    """
+    Queues roadmap generation for a session, unless a job for it is already
+    pending or running. Returns the session's active job.
+    """
+    while True:
+        job = RoadmapJob.objects.filter(session=session, status__in=ACTIVE_STATUSES).first()
+        if job is not None:
+            return job
+        try:
+            with transaction.atomic():
+                return RoadmapJob.objects.create(session=session)
+        except IntegrityError:
+            # A concurrent turn for this session (possibly in another worker)
+            # queued one first; the unique constraint refused ours.
+            continue
+
+
+def get_latest_job(session):
+    return RoadmapJob.objects.filter(session=session).order_by('-created_at').first()
+
+
+def claim_next_job(worker_id):
+    """
+    Atomically claims the oldest runnable job for this worker. Jobs left
+    running by a worker that died are reclaimed after ROADMAP_JOB_LOCK_TIMEOUT.
+    Returns the claimed job, or None if there is nothing to do.
+    """
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=settings.ROADMAP_JOB_LOCK_TIMEOUT)
+    candidates = (
+        RoadmapJob.objects.filter(status='pending', run_after__lte=now)
+        | RoadmapJob.objects.filter(status='running', locked_at__lt=stale_before)
+    ).order_by('run_after').values_list('job_id', 'status', 'locked_at')[:10]
+
+    for job_id, current_status, locked_at in candidates:
+        # The conditional update is the lock: only one worker can move the row
+        # out of the state it was read in.
+        claimed = RoadmapJob.objects.filter(job_id=job_id, status=current_status, locked_at=locked_at).update(
+            status='running', locked_by=worker_id, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return RoadmapJob.objects.select_related('session').get(job_id=job_id)
+    return None
+
+
+def run_job(job):
+    """
+    Generates the roadmap for a claimed job and records the outcome. Failed
+    attempts are retried with exponential backoff up to ROADMAP_JOB_MAX_ATTEMPTS.
+    """
+    session = job.session
+    try:
+        history_text = format_transcript(
+            ChatMessage.objects.filter(session=session).order_by("timestamp").values_list("sender", "message")
+        )
+
+        roadmap_json = generate_career_roadmap(session, history_text)
+        if not roadmap_json or 'error' in roadmap_json:
+            raise ValueError((roadmap_json or {}).get('error', 'Empty roadmap response.'))
+
+        session.roadmap_data = roadmap_json
+        session.save(update_fields=['roadmap_data', 'updated_at'])
+        job.status = 'ready'
+        job.last_error = None
+        print(f"Roadmap job {job.job_id} finished.")
+    except Exception as e:
+        job.last_error = str(e)
+        if job.attempts < settings.ROADMAP_JOB_MAX_ATTEMPTS:
+            job.status = 'pending'
+            job.run_after = timezone.now() + timedelta(
+                seconds=settings.ROADMAP_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+            print(f"Roadmap job {job.job_id} failed (attempt {job.attempts}), retrying: {e}")
+        else:
+            job.status = 'failed'
+            print(f"Roadmap job {job.job_id} failed permanently: {e}")
+    job.locked_by = None
+    job.locked_at = None
+    job.save(update_fields=['status', 'last_error', 'run_after', 'locked_by', 'locked_at', 'updated_at'])
+    return job
+
+
+def run_worker(poll_interval=1.0, once=False):
+    """
+    Claims and runs jobs until interrupted. With `once`, returns as soon as
+    the queue is empty.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    while True:
+        close_old_connections()
+        job = claim_next_job(worker_id)
+        if job is not None:
+            run_job(job)
+            continue
+        if once:
+            return
+        time.sleep(poll_interval)
@@ -0,0 +1,253 @@
+import json
+import os
+import shutil
+import time
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .jobs import ACTIVE_STATUSES
+from .llm_engine import get_resume_index_path, shared_resume_store
+from .models import ArchivedSession, ChatMessage, ResumeDocument, RoadmapJob, UserSession
+from .uploads import RESUME_UPLOAD_DIR
+
+# Keeps the live tables and the resume storage from growing forever. Run
+# `manage.py run_lifecycle` from cron; each step works in batches of
+# LIFECYCLE_BATCH_SIZE, each in its own short transaction, and pauses between
+# batches so chat turns get the write lock in between.
+#
+# 1. archive_inactive_sessions: sessions idle for SESSION_ARCHIVE_AFTER_DAYS
+#    move to ArchivedSession (one zlib-compressed JSON blob each) and their
+#    rows and messages are deleted.
+# 2. delete_orphaned_artifacts: resume files, extracted text, indexes and
+#    shared-store chunks that no session references any more.
+# 3. enforce_disk_quota: while resume files and indexes use more than
+#    RESUME_DISK_QUOTA_BYTES, evict the least recently used. Indexes go first,
+#    since they are rebuilt from the stored text on next use.
+
+# Files and rows younger than this are never treated as orphans: an upload
+# stores its file before the session records it.
+ORPHAN_GRACE_PERIOD = timedelta(hours=1)
+
+
+def _batches(queryset, batch_size):
+    """
+    Yields lists of up to `batch_size` primary keys, re-running the query for
+    each batch so rows removed by the previous batch drop out.
+    """
+    while True:
+        batch = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        if len(batch) < batch_size:
+            return
+
+
+# --- Archival ---
+def _archive_document(session, messages):
+    return zlib.compress(json.dumps({'session': session, 'messages': messages}, cls=DjangoJSONEncoder).encode('utf-8'))
+
+
+def archive_inactive_sessions(older_than_days, batch_size, pause=0.0):
+    """
+    Moves sessions not updated for `older_than_days` days, with no roadmap
+    job in progress, into the archive. Returns the number archived.
+    """
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    inactive = (
+        UserSession.objects.filter(updated_at__lt=cutoff)
+        .exclude(roadmap_jobs__status__in=ACTIVE_STATUSES)
+        .order_by('updated_at')
+    )
+    archived = 0
+    for batch in _batches(inactive, batch_size):
+        with transaction.atomic():
+            # Re-read under the lock: a session that got a message since the
+            # batch was picked stays live.
+            sessions = list(inactive.filter(pk__in=batch).select_for_update().values())
+            ids = [session['session_id'] for session in sessions]
+            messages = {}
+            for row in ChatMessage.objects.filter(session_id__in=ids).order_by('timestamp').values(
+                'session_id', 'sender', 'message', 'timestamp'
+            ):
+                messages.setdefault(row.pop('session_id'), []).append(row)
+            ArchivedSession.objects.bulk_create([
+                ArchivedSession(
+                    session_id=session['session_id'],
+                    name=session['name'],
+                    status=session['status'],
+                    message_count=session['message_count'],
+                    created_at=session['created_at'],
+                    last_active_at=session['updated_at'],
+                    data=_archive_document(session, messages.get(session['session_id'], [])),
+                )
+                for session in sessions
+            ], ignore_conflicts=True)
+            ChatMessage.objects.filter(session_id__in=ids).delete()
+            RoadmapJob.objects.filter(session_id__in=ids).delete()
+            UserSession.objects.filter(pk__in=ids).delete()
+        archived += len(sessions)
+        # Sessions that became active were skipped; stop rather than
+        # picking the same batch again.
+        if not sessions:
+            break
+        time.sleep(pause)
+    return archived
+
+
+# --- Orphaned Artifacts ---
+def _referenced_resumes():
+    """
+    The content hashes and file names of resumes live sessions use.
+    """
+    hashes = set()
+    names = set()
+    for resume_hash, name in UserSession.objects.values_list('resume_hash', 'resume_file').iterator():
+        if resume_hash:
+            hashes.add(resume_hash)
+        if name:
+            names.add(name)
+    return hashes, names
+
+
+def _is_old(path, now):
+    try:
+        return now - os.path.getmtime(path) > ORPHAN_GRACE_PERIOD.total_seconds()
+    except FileNotFoundError:
+        return False
+
+
+def _remove_path(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def delete_orphaned_artifacts(batch_size, pause=0.0):
+    """
+    Deletes resume files, extracted documents, indexes and shared-store
+    chunks no session references. Returns a dict of counts.
+    """
+    hashes, names = _referenced_resumes()
+    now = time.time()
+    removed = {'files': 0, 'indexes': 0, 'documents': 0, 'chunks': 0}
+
+    upload_root = os.path.join(settings.MEDIA_ROOT, RESUME_UPLOAD_DIR)
+    if os.path.isdir(upload_root):
+        for filename in os.listdir(upload_root):
+            name = f"{RESUME_UPLOAD_DIR}/{filename}"
+            path = os.path.join(upload_root, filename)
+            if name not in names and _is_old(path, now):
+                default_storage.delete(name)
+                removed['files'] += 1
+
+    if os.path.isdir(settings.RESUME_INDEX_ROOT):
+        for entry in os.listdir(settings.RESUME_INDEX_ROOT):
+            # <hash> directories, and <hash>.<id>.tmp ones left by a crash.
+            path = os.path.join(settings.RESUME_INDEX_ROOT, entry)
+            if (entry.endswith('.tmp') or entry not in hashes) and _is_old(path, now):
+                _remove_path(path)
+                removed['indexes'] += 1
+
+    orphaned_documents = ResumeDocument.objects.exclude(content_hash__in=hashes).filter(
+        created_at__lt=timezone.now() - ORPHAN_GRACE_PERIOD
+    )
+    for batch in _batches(orphaned_documents, batch_size):
+        ResumeDocument.objects.filter(pk__in=batch).delete()
+        removed['documents'] += len(batch)
+        time.sleep(pause)
+
+    if settings.RESUME_INDEX_MODE == 'shared':
+        _, removed['chunks'] = shared_resume_store.compact()
+    return removed
+
+
+# --- Disk Quota ---
+def _path_size(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(directory, filename))
+        for directory, _, filenames in os.walk(path)
+        for filename in filenames
+    )
+
+
+def resume_disk_entries():
+    """
+    Every stored resume file and per-resume index, as dicts with kind
+    ('file' or 'index'), resume_hash, path, name (files only) and size.
+    """
+    hash_by_name = dict(
+        UserSession.objects.exclude(resume_hash=None).exclude(resume_file='')
+        .values_list('resume_file', 'resume_hash').iterator()
+    )
+    entries = []
+    upload_root = os.path.join(settings.MEDIA_ROOT, RESUME_UPLOAD_DIR)
+    if os.path.isdir(upload_root):
+        for filename in os.listdir(upload_root):
+            name = f"{RESUME_UPLOAD_DIR}/{filename}"
+            path = os.path.join(upload_root, filename)
+            # Content-addressed files are named by their hash; older
+            # uploads are matched through the sessions that store them.
+            resume_hash = hash_by_name.get(name) or os.path.splitext(filename)[0]
+            entries.append({'kind': 'file', 'resume_hash': resume_hash, 'path': path, 'name': name, 'size': _path_size(path)})
+    if os.path.isdir(settings.RESUME_INDEX_ROOT):
+        for entry in os.listdir(settings.RESUME_INDEX_ROOT):
+            path = get_resume_index_path(entry)
+            entries.append({'kind': 'index', 'resume_hash': entry, 'path': path, 'name': None, 'size': _path_size(path)})
+    return entries
+
+
+def enforce_disk_quota(max_bytes, batch_size, pause=0.0):
+    """
+    Evicts the least recently used resume indexes, then resume files, until
+    their total size fits in `max_bytes`. A file is only evicted once its
+    text has been extracted, and its sessions stop pointing at it. Returns
+    (bytes_used_before, bytes_freed).
+    """
+    entries = resume_disk_entries()
+    used = sum(entry['size'] for entry in entries)
+    if not max_bytes or used <= max_bytes:
+        return used, 0
+
+    last_used = dict(
+        UserSession.objects.exclude(resume_hash=None).values('resume_hash')
+        .annotate(last_used=Max('updated_at')).values_list('resume_hash', 'last_used')
+    )
+    never = timezone.now() - timedelta(days=36500)
+    extracted = set()
+    file_hashes = [entry['resume_hash'] for entry in entries if entry['kind'] == 'file']
+    for start in range(0, len(file_hashes), batch_size):
+        extracted.update(ResumeDocument.objects.filter(
+            content_hash__in=file_hashes[start:start + batch_size]
+        ).values_list('content_hash', flat=True))
+
+    entries.sort(key=lambda entry: (entry['kind'] != 'index', last_used.get(entry['resume_hash']) or never))
+    freed = 0
+    evicted_files = []
+    for entry in entries:
+        if used - freed <= max_bytes:
+            break
+        if entry['kind'] == 'file' and entry['resume_hash'] not in extracted:
+            continue
+        _remove_path(entry['path'])
+        freed += entry['size']
+        if entry['kind'] == 'file':
+            evicted_files.append(entry['name'])
+
+    for start in range(0, len(evicted_files), batch_size):
+        UserSession.objects.filter(resume_file__in=evicted_files[start:start + batch_size]).update(resume_file='')
+        time.sleep(pause)
+    return used, freed
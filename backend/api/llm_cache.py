@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .metrics import record_cache_lookup
+
+# Cache for Groq responses to prompts that don't depend on the conversation
+# (welcome messages, roadmap retries). Entries are keyed on a hash of the
+# model, the whitespace-normalized messages and the sampling parameters, and
+# stored in the `llm` cache from CACHES, so the backend (per-process memory,
+# database, Redis) is a deployment choice.
+#
+# Concurrent requests for the same key are coalesced: one caller makes the
+# upstream call and the others in this process wait for its result.
+
+_inflight = {}  # key -> _Flight
+_inflight_lock = threading.Lock()
+_async_inflight = {}  # key -> asyncio.Future
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def _normalize(text):
+    return " ".join(str(text).split())
+
+
+def make_key(model, messages, **params):
+    payload = json.dumps({
+        'model': model,
+        'messages': [{'role': m['role'], 'content': _normalize(m['content'])} for m in messages],
+        'params': params,
+    }, sort_keys=True)
+    return f"llm:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def get_or_create(key, producer, cacheable=None, ttl=None):
+    """
+    Returns the cached response for `key`, or calls `producer()` to make it.
+    The result is stored unless `cacheable(result)` is false, e.g. for a
+    roadmap response that didn't parse.
+    """
+    cache = caches['llm']
+    cached = cache.get(key)
+    if cached is not None:
+        record_cache_lookup('llm', 'hit')
+        return cached
+
+    with _inflight_lock:
+        flight = _inflight.get(key)
+        leader = flight is None
+        if leader:
+            flight = _inflight[key] = _Flight()
+
+    if not leader:
+        flight.done.wait()
+        record_cache_lookup('llm', 'coalesced')
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    record_cache_lookup('llm', 'miss')
+    try:
+        flight.result = producer()
+        if cacheable is None or cacheable(flight.result):
+            cache.set(key, flight.result, settings.LLM_CACHE_TTL if ttl is None else ttl)
+        return flight.result
+    except Exception as e:
+        flight.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        flight.done.set()
+
+
+async def aget_or_create(key, producer, cacheable=None, ttl=None):
+    """
+    Async version of get_or_create; `producer` is a coroutine function.
+    Coalesces callers on the same event loop.
+    """
+    cache = caches['llm']
+    cached = await cache.aget(key)
+    if cached is not None:
+        record_cache_lookup('llm', 'hit')
+        return cached
+
+    flight = _async_inflight.get(key)
+    if flight is not None:
+        record_cache_lookup('llm', 'coalesced')
+        return await asyncio.shield(flight)
+
+    record_cache_lookup('llm', 'miss')
+    flight = _async_inflight[key] = asyncio.get_running_loop().create_future()
+    try:
+        result = await producer()
+        if cacheable is None or cacheable(result):
+            await cache.aset(key, result, settings.LLM_CACHE_TTL if ttl is None else ttl)
+        flight.set_result(result)
+        return result
+    except Exception as e:
+        flight.set_exception(e)
+        # Nobody may be waiting; don't log "exception was never retrieved".
+        flight.exception()
+        raise
+    finally:
+        del _async_inflight[key]
+        if not flight.done():
+            # The leader was cancelled; its waiters are too.
+            flight.cancel()
@@ -1,63 +1,526 @@
+import asyncio
+import hashlib
 import json
+import os
 import re
-from groq import Groq
+import shutil
+import threading
+import time
+import uuid
+from asgiref.sync import sync_to_async
+from groq import AsyncGroq, Groq
 
-from langchain_community.document_loaders import PyPDFLoader
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import FAISS
-from .youtube import get_youtube_courses
+from .youtube import get_youtube_courses_bulk
+from .vector_cache import VectorStoreCache
+from .embedding_service import RemoteEmbeddings
+from .embedding_cache import CachedEmbeddings
+from .shared_index import SharedVectorStore
+from .models import ResumeDocument
+from .roadmap_schema import ROADMAP_PATHWAY_COUNT, describe_pathway_schema, valid_pathways
+from .resume_text import ResumeUnreadable, extract_profile_locally, extract_resume_text, format_profile, normalize_profile
+from .metrics import span, observe, record_groq_usage, register_collector
+from .llm_cache import aget_or_create, get_or_create, make_key
+from .groq_client import LLMUnavailable, acreate_chat_completion, build_async_http_client, build_http_client, create_chat_completion
 from django.conf import settings
 
 # --- Initialization ---
-client = Groq(api_key=settings.GROQ_API_KEY)
+# The Groq client and the embedding model are created on first use rather than
+# at import, so processes that never chat (migrate, admin, shell) don't pay
+# the model load time and memory. Use `manage.py warmup_models` or the
+# PRELOAD_MODELS setting to load them ahead of the first request.
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
 
-# Switched to Hugging Face Embeddings for Deployment.
-# This model is self-contained and doesn't require an external service like Ollama.
-embeddings = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2",
-    model_kwargs={'device': 'cpu'} # Use CPU for broad compatibility
-)
+_client = None
+_async_client = None
+_embeddings = None
+_init_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Returns the process-wide Groq client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _init_lock:
+            if _client is None:
+                # Retries are handled by groq_client, which also rate limits them.
+                _client = Groq(
+                    api_key=settings.GROQ_API_KEY, base_url=settings.GROQ_BASE_URL or None,
+                    http_client=build_http_client(), max_retries=0,
+                )
+    return _client
+
+
+def get_async_client():
+    """
+    Returns the process-wide async Groq client used by the ASGI views.
+    """
+    global _async_client
+    if _async_client is None:
+        with _init_lock:
+            if _async_client is None:
+                _async_client = AsyncGroq(
+                    api_key=settings.GROQ_API_KEY, base_url=settings.GROQ_BASE_URL or None,
+                    http_client=build_async_http_client(), max_retries=0,
+                )
+    return _async_client
+
+
+def load_local_embeddings():
+    """
+    Loads the sentence-transformers model into this process.
+    """
+    # Switched to Hugging Face Embeddings for Deployment.
+    # This model is self-contained and doesn't require an external service like Ollama.
+    return HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL_NAME,
+        model_kwargs={'device': 'cpu'} # Use CPU for broad compatibility
+    )
+
+
+def get_embeddings():
+    """
+    Returns the process-wide embeddings object, creating it on first use.
+    When EMBEDDING_SERVICE_SOCKET is set, embeddings come from the shared
+    embedding service instead of a model loaded in this worker. Either way,
+    vectors are cached (see embedding_cache).
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _init_lock:
+            if _embeddings is None:
+                if settings.EMBEDDING_SERVICE_SOCKET:
+                    embeddings = RemoteEmbeddings(settings.EMBEDDING_SERVICE_SOCKET)
+                else:
+                    embeddings = load_local_embeddings()
+                _embeddings = CachedEmbeddings(
+                    embeddings, EMBEDDING_MODEL_NAME, settings.QUERY_EMBEDDING_CACHE_SIZE
+                )
+    return _embeddings
+
+
+def warm_up():
+    """
+    Loads the embedding model and Groq client and runs one embedding so the
+    model weights are fully paged in. Called before forking workers, the
+    loaded pages are shared copy-on-write between them.
+    """
+    get_client()
+    get_embeddings().embed_query("warm up")
+
+
+# Loaded resume indexes, shared by consecutive turns handled in this worker.
+resume_index_cache = VectorStoreCache(max_bytes=settings.RESUME_INDEX_CACHE_BYTES)
+# Every resume's chunks in one store, when RESUME_INDEX_MODE is 'shared'.
+shared_resume_store = SharedVectorStore(settings.RESUME_SHARED_INDEX_ROOT)
+
+
+def _resume_index_cache_metrics():
+    stats = resume_index_cache.stats()
+    return [
+        ('visiontrack_resume_index_cache_lookups_total', 'counter', "Resume index cache lookups by result.",
+         [({'result': 'hit'}, stats['hits']), ({'result': 'miss'}, stats['misses'])]),
+        ('visiontrack_resume_index_cache_evictions_total', 'counter', "Resume indexes evicted from the cache.",
+         [({}, stats['evictions'])]),
+        ('visiontrack_resume_index_cache_bytes', 'gauge', "Estimated size of the cached resume indexes.",
+         [({}, stats['resident_bytes'])]),
+    ]
+
+
+register_collector(_resume_index_cache_metrics)
 
 
 # --- Resume Processing Function ---
-def process_resume(file_path: str):
+def get_resume_document(file_path: str, resume_hash: str):
     """
-    Reads a resume file (PDF), splits it into chunks, and creates a searchable
-    vector store (a smart index) of its content.
+    Returns the stored text of a resume, extracting it from the PDF the first
+    time this content is seen. Returns None if extraction timed out or failed
+    in a way that may not happen again; nothing is stored then.
     """
-    if not file_path:
-        return None
+    document = ResumeDocument.objects.filter(content_hash=resume_hash).first()
+    if document is not None:
+        return document
     try:
-        loader = PyPDFLoader(file_path)
-        pages = loader.load()
-        text = " ".join([page.page_content for page in pages])
-        
+        with span('pdf_extract'):
+            text, page_count, truncated = extract_resume_text(file_path)
+    except ResumeUnreadable as e:
+        # Not a PDF pypdf can read; store it as empty so we don't retry.
+        print(f"Unreadable resume {resume_hash}: {e}")
+        text, page_count, truncated = "", 0, False
+    except Exception as e:
+        print(f"Error extracting resume text: {e}")
+        return None
+    document, _ = ResumeDocument.objects.get_or_create(
+        content_hash=resume_hash,
+        defaults={'text': text, 'page_count': page_count, 'truncated': truncated},
+    )
+    return document
+
+
+def split_resume_text(text: str):
+    with span('text_split'):
         text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        chunks = text_splitter.split_text(text)
+        return text_splitter.split_text(text)
+
+
+def process_resume(text: str):
+    """
+    Splits a resume's text into chunks and creates a searchable vector store
+    (a smart index) of its content.
+    """
+    if not text:
+        return None
+    try:
+        chunks = split_resume_text(text)
         
         # Create the smart index from the resume chunks
-        vector_store = FAISS.from_texts(chunks, embedding=embeddings)
-        print(f"Successfully processed resume: {file_path}")
+        with span('embed_documents'):
+            vector_store = FAISS.from_texts(chunks, embedding=get_embeddings())
+        print(f"Successfully processed resume ({len(chunks)} chunks)")
         return vector_store
     except Exception as e:
         print(f"Error processing resume file: {e}")
         return None
 
+# --- Resume Index Store ---
+# Indexes are built once per upload and saved to disk under the SHA-256 of the
+# file's contents, so identical re-uploads reuse the existing index and chat
+# turns only ever have to load it.
+def hash_resume_file(file_path: str):
+    """
+    Returns the SHA-256 hex digest of a file's contents, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def get_resume_index_path(resume_hash: str):
+    return os.path.join(settings.RESUME_INDEX_ROOT, resume_hash)
+
+
+def build_resume_index(file_path: str, resume_hash: str = None):
+    """
+    Extracts the text of a resume and builds and persists its vector index,
+    unless that was already done for the same content. Pass `resume_hash` if
+    the content hash is already known. Returns the content hash, or None on
+    failure.
+    """
+    if not file_path:
+        return None
+    resume_hash = resume_hash or hash_resume_file(file_path)
+    if settings.RESUME_INDEX_MODE == 'shared':
+        return _add_to_shared_store(file_path, resume_hash)
+
+    index_path = get_resume_index_path(resume_hash)
+    if os.path.isdir(index_path):
+        print(f"Reusing stored resume index: {resume_hash}")
+        return resume_hash
+
+    # Text is extracted once per distinct file; scanned PDFs have none, so
+    # they get a document but no index.
+    document = get_resume_document(file_path, resume_hash)
+    if document is None:
+        return None
+    vector_store = process_resume(document.text)
+    if not vector_store:
+        return resume_hash if not document.text else None
+
+    _save_resume_index(resume_hash, vector_store)
+    return resume_hash
+
+
+def _save_resume_index(resume_hash: str, vector_store):
+    # Write to a temporary directory first and rename it into place, so a
+    # concurrent reader never sees a half-written index.
+    index_path = get_resume_index_path(resume_hash)
+    os.makedirs(settings.RESUME_INDEX_ROOT, exist_ok=True)
+    tmp_path = f"{index_path}.{uuid.uuid4().hex}.tmp"
+    vector_store.save_local(tmp_path)
+    try:
+        os.rename(tmp_path, index_path)
+    except OSError:
+        # Another worker stored the same resume first; theirs is identical.
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def _add_to_shared_store(file_path: str, resume_hash: str):
+    if shared_resume_store.has_resume(resume_hash):
+        print(f"Reusing stored resume chunks: {resume_hash}")
+        return resume_hash
+    document = get_resume_document(file_path, resume_hash)
+    if document is None:
+        return None
+    if document.text:
+        try:
+            chunks = split_resume_text(document.text)
+            with span('embed_documents'):
+                vectors = get_embeddings().embed_documents(chunks)
+            shared_resume_store.add(resume_hash, chunks, vectors)
+        except Exception as e:
+            print(f"Error processing resume file: {e}")
+            return None
+    return resume_hash
+
+
+def load_resume_index(resume_hash: str):
+    """
+    Returns a previously built resume index, from the in-process cache when
+    it is hot, otherwise from disk. Returns None if missing.
+    """
+    if not resume_hash:
+        return None
+    return resume_index_cache.get_or_load(resume_hash, lambda: _read_resume_index(resume_hash))
+
+
+def _read_resume_index(resume_hash: str):
+    index_path = get_resume_index_path(resume_hash)
+    if not os.path.isdir(index_path):
+        return _rebuild_resume_index(resume_hash)
+    try:
+        # The index was written by this application, so unpickling its
+        # docstore is safe.
+        with span('index_load'):
+            return FAISS.load_local(index_path, get_embeddings(), allow_dangerous_deserialization=True)
+    except Exception as e:
+        print(f"Error loading resume index {resume_hash}: {e}")
+        return None
+
+
+def _rebuild_resume_index(resume_hash: str):
+    """
+    Rebuilds an index removed by the lifecycle manager's disk quota from the
+    stored resume text. Chunk embeddings are cached, so this is cheap.
+    """
+    document = ResumeDocument.objects.filter(content_hash=resume_hash).first()
+    if document is None or not document.text:
+        return None
+    vector_store = process_resume(document.text)
+    if vector_store:
+        _save_resume_index(resume_hash, vector_store)
+    return vector_store
+
+
+def embed_query(query: str):
+    with span('embed_query'):
+        return get_embeddings().embed_query(query)
+
+
+def search_resume_index(vector_store, query: str, k: int):
+    """
+    Returns the text of the `k` resume chunks most similar to `query`.
+    """
+    query_vector = embed_query(query)
+    with span('faiss_search'):
+        relevant_chunks = vector_store.similarity_search_by_vector(query_vector, k=k)
+    return " ".join([chunk.page_content for chunk in relevant_chunks])
+
+
+def retrieve_resume_context(resume_hash: str, query: str, k: int):
+    """
+    Returns the text of the `k` chunks of a stored resume most similar to
+    `query`, from the per-resume index or the shared store depending on
+    RESUME_INDEX_MODE. Returns None if the resume has no stored chunks.
+    """
+    if settings.RESUME_INDEX_MODE == 'shared':
+        return _search_shared_store(resume_hash, embed_query(query), k)
+
+    vector_store = load_resume_index(resume_hash)
+    if not vector_store:
+        return None
+    return search_resume_index(vector_store, query, k)
+
+
+def _search_shared_store(resume_hash: str, query_vector, k: int):
+    with span('vector_search'):
+        texts = shared_resume_store.search(resume_hash, query_vector, k)
+    return " ".join(texts) or None
+
+
+# --- Resume Profile ---
+# A structured profile of the resume (summary, skills, education,
+# experience) is built once per distinct resume and copied onto the session
+# at upload. Chat prompts include it on every turn; the vector index is only
+# searched when a message asks about resume details the profile can't cover.
+RESUME_PROFILE_INPUT_TOKENS = 2500
+
+# Messages that ask about specifics of the resume.
+RESUME_DETAIL_PATTERN = re.compile(
+    r"\b(resume|cv|project|projects|internships?|experience|worked|work history|job|jobs|company|"
+    r"certificat\w*|achievements?|awards?|publications?|gpa|cgpa|grades?|marks|thesis|responsibilit\w*)\b",
+    re.IGNORECASE,
+)
+
+
+def get_resume_profile(file_path: str, resume_hash: str):
+    """
+    Returns the structured profile of a resume, building it the first time
+    this content is seen. Returns None if the resume has no text.
+    """
+    if not resume_hash:
+        return None
+    document = get_resume_document(file_path, resume_hash)
+    if document is None or not document.text:
+        return None
+    if document.profile is not None:
+        return document.profile
+
+    profile = None
+    if settings.RESUME_PROFILE_SOURCE == 'llm':
+        try:
+            profile = extract_profile_with_llm(document.text)
+        except (LLMUnavailable, ValueError) as e:
+            print(f"Using local resume profile: {e}")
+    if profile is None:
+        with span('resume_profile_local'):
+            profile = extract_profile_locally(document.text)
+    ResumeDocument.objects.filter(content_hash=resume_hash).update(profile=profile)
+    return profile
+
+
+def extract_profile_with_llm(text: str):
+    """
+    Asks the LLM for the resume's profile as JSON. Raises ValueError if the
+    reply isn't a JSON object.
+    """
+    prompt = f"""
+    Extract a profile from the resume below. Respond with a JSON object with exactly these keys:
+    "summary": one or two sentences describing the candidate,
+    "skills": a list of skills, tools and languages,
+    "education": a list of degrees or schools, each with institution and years if given,
+    "experience": a list of jobs, internships and projects, each as one short line with role, organization and main work.
+    Use empty values for anything the resume doesn't mention. Do not invent details.
+
+    Resume:
+    {truncate_to_tokens(text, RESUME_PROFILE_INPUT_TOKENS)}
+    """
+
+    with span('groq_resume_profile'):
+        chat_completion = create_chat_completion(
+            get_client(),
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            model="llama-3.1-8b-instant",
+            max_tokens=800,
+            temperature=0,
+            response_format={"type": "json_object"}
+        )
+    record_groq_usage('resume_profile', chat_completion.usage)
+
+    profile = json.loads(chat_completion.choices[0].message.content)
+    if not isinstance(profile, dict):
+        raise ValueError("Resume profile is not a JSON object.")
+    return normalize_profile(profile)
+
+
+def asks_about_resume_details(message: str):
+    return bool(RESUME_DETAIL_PATTERN.search(message))
+
+
+# --- Prompt Budgeting ---
+def estimate_tokens(text: str):
+    """
+    Cheap token estimate (about 4 characters per token for English text).
+    Close enough for budgeting without loading a tokenizer.
+    """
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int, keep_end: bool = False):
+    """
+    Trims text to roughly `max_tokens`. With keep_end, the end of the text is
+    kept instead of the beginning (used for conversation history).
+    """
+    max_chars = max_tokens * 4
+    if len(text) <= max_chars:
+        return text
+    return text[-max_chars:] if keep_end else text[:max_chars]
+
+
+def summarize_conversation(previous_summary: str, transcript: str):
+    """
+    Folds older conversation turns into the running conversation summary.
+    """
+    prompt = f"""
+    You maintain a running summary of a career counseling conversation between a User and an AI counselor.
+
+    Current summary:
+    {previous_summary or "(none yet)"}
+
+    New messages to fold into the summary:
+    {transcript}
+
+    Write the updated summary in under {settings.HISTORY_SUMMARY_MAX_TOKENS} words. Keep facts about the user (interests, concerns, goals, education, experience) and any advice already given. Output only the summary.
+    """
+
+    with span('groq_summary'):
+        chat_completion = create_chat_completion(
+            get_client(),
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            model="llama-3.1-8b-instant",
+            max_tokens=settings.HISTORY_SUMMARY_MAX_TOKENS * 2,
+            temperature=0.2
+        )
+    record_groq_usage('summary', chat_completion.usage)
+
+    return chat_completion.choices[0].message.content.strip()
+
+
 # --- Main AI Function (Uses Groq) ---
-def chat_with_ai(context: dict, message: str, history: str):
+def needs_resume_search(resume_hash, resume_profile, message: str):
     """
-    Generates an AI response using the Groq API.
+    Whether a chat turn's prompt should include resume excerpts. Sessions
+    without a profile (older uploads, resumes with no text) always fall back
+    to searching the index.
+    """
+    return bool(resume_hash) and (not resume_profile or asks_about_resume_details(message))
+
+
+def build_chat_prompt(context: dict, message: str, history: str):
+    """
+    Builds the counselor prompt for one chat turn, including the resume
+    profile and, for messages about resume details, matching resume excerpts.
+    """
+    resume_hash = context.get("resume_hash")
+    if not resume_hash and context.get("resume_path"):
+        resume_hash = build_resume_index(context["resume_path"])
+    relevant_text = None
+    if needs_resume_search(resume_hash, context.get("resume_profile"), message):
+        # Find relevant text in the resume based on the current message
+        relevant_text = retrieve_resume_context(resume_hash, message, k=2)
+    return format_chat_prompt(context, message, history, relevant_text)
+
+
+def format_chat_prompt(context: dict, message: str, history: str, relevant_text=None):
+    """
+    Fills in the counselor prompt from the session context and the resume
+    excerpts already retrieved, if any. Does no database work.
     """
     resume_context = "No resume has been provided for this session yet."
+    resume_profile = context.get("resume_profile")
+    if resume_profile:
+        resume_context = truncate_to_tokens(format_profile(resume_profile), settings.PROMPT_RESUME_TOKENS)
+    if relevant_text:
+        relevant_text = truncate_to_tokens(relevant_text, settings.PROMPT_RESUME_TOKENS)
+        resume_context = f"{resume_context}\n    Excerpts: {relevant_text}" if resume_profile else relevant_text
+        print("Found relevant resume context.")
 
-    if context.get("resume_path"):
-        vector_store = process_resume(context["resume_path"])
-        if vector_store:
-            # Find relevant text in the resume based on the current message
-            relevant_chunks = vector_store.similarity_search(message, k=2)
-            resume_context = " ".join([chunk.page_content for chunk in relevant_chunks])
-            print("Found relevant resume context.")
+    profile = truncate_to_tokens(
+        f"""- Name: {context.get("name", "the user")}
+    - Status: {context.get("status", "N/A")}
+    - Age: {context.get("age", "N/A")}""",
+        settings.PROMPT_PROFILE_TOKENS,
+    )
+    history = truncate_to_tokens(history, settings.PROMPT_HISTORY_TOKENS, keep_end=True)
 
     # Construct the prompt for the Groq API
     prompt = f"""
@@ -73,9 +536,7 @@ def chat_with_ai(context: dict, message: str, history: str):
         - For college/passout, once they provide a resume, analyze it and begin counseling.
 
     **User's Background Information:**
-    - Name: {context.get("name", "the user")}
-    - Status: {context.get("status", "N/A")}
-    - Age: {context.get("age", "N/A")}
+    {profile}
     - **Resume Context:** {resume_context}
 
     **Conversation History:**
@@ -88,33 +549,145 @@ def chat_with_ai(context: dict, message: str, history: str):
 
     Your next response as the AI Counselor:
     """
+    return prompt
 
+
+def complete_chat_prompt(prompt: str):
+    """
+    Sends a finished counselor prompt to Groq and returns the reply text.
+    """
     # Groq API call for fast text generation
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "user", "content": prompt}
-        ],
-        model="llama-3.1-8b-instant",
-        max_tokens=1000,
-        temperature=0.7
-    )
+    with span('groq_chat'):
+        chat_completion = create_chat_completion(
+            get_client(),
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            model="llama-3.1-8b-instant",
+            max_tokens=1000,
+            temperature=0.7
+        )
+    record_groq_usage('chat', chat_completion.usage)
 
     return chat_completion.choices[0].message.content
 
 
+def chat_with_ai(context: dict, message: str, history: str):
+    """
+    Generates an AI response using the Groq API.
+    """
+    prompt = build_chat_prompt(context, message, history)
+    return complete_chat_prompt(prompt)
+
+
+# --- Welcome Messages ---
+# The first turn's prompt depends only on the questionnaire answers. It is
+# built with a placeholder instead of the user's name, so one cached reply
+# serves every new user with the same status and age, and the name is
+# filled in afterwards.
+WELCOME_TRIGGER_MESSAGE = "The user has just completed the questionnaire and joined the chat."
+NAME_PLACEHOLDER = "[Name]"
+
+WELCOME_TEMPLATES = {
+    'school_student': "Hi {name}, welcome! I'm Marvin, your career counselor. I'm here to help you figure out which subjects and fields might suit you best. To start, what do you enjoy doing most, in school or outside of it?",
+    'college_student': "Hi {name}, welcome! I'm Marvin, your career counselor. I'm here to help you plan your next steps, from internships to your first role. To start, what are you studying, and what parts of it do you enjoy most?",
+    'passout': "Hi {name}, welcome! I'm Marvin, your career counselor. I'm here to help you find a direction that fits your skills and goals. To start, tell me a little about what you've been doing since you graduated.",
+}
+
+
+def _welcome_prompt(context: dict):
+    return build_chat_prompt({**context, "name": NAME_PLACEHOLDER}, WELCOME_TRIGGER_MESSAGE, "")
+
+
+def _fill_name(text: str, name: str):
+    return re.sub(re.escape(NAME_PLACEHOLDER), lambda _: name, text, flags=re.IGNORECASE)
+
+
+def generate_welcome_message(context: dict):
+    """
+    Returns the first AI message of a session, from the fixed templates when
+    WELCOME_MESSAGE_SOURCE is 'template', otherwise from the (cached) model.
+    """
+    name = context.get("name") or "there"
+    if settings.WELCOME_MESSAGE_SOURCE == 'template':
+        return render_welcome_template(context)
+
+    prompt = _welcome_prompt(context)
+    key = make_key("llama-3.1-8b-instant", [{"role": "user", "content": prompt}], max_tokens=1000, temperature=0.7)
+    try:
+        return _fill_name(get_or_create(key, lambda: complete_chat_prompt(prompt)), name)
+    except LLMUnavailable as e:
+        # Don't fail sign-up because Groq is saturated.
+        print(f"Using template welcome message: {e}")
+        return render_welcome_template(context)
+
+
+def render_welcome_template(context: dict):
+    template = WELCOME_TEMPLATES.get(context.get("status"), WELCOME_TEMPLATES['college_student'])
+    return template.format(name=context.get("name") or "there")
+
+
+def stream_chat_with_ai(context: dict, message: str, history: str):
+    """
+    Same as chat_with_ai, but yields the response text piece by piece as Groq
+    generates it.
+    """
+    prompt = build_chat_prompt(context, message, history)
+
+    start = time.perf_counter()
+    first_token = True
+    with span('groq_chat_stream'):
+        stream = create_chat_completion(
+            get_client(),
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            model="llama-3.1-8b-instant",
+            max_tokens=1000,
+            temperature=0.7,
+            stream=True
+        )
+
+        for chunk in stream:
+            # Groq reports usage on the last chunk.
+            x_groq = getattr(chunk, 'x_groq', None)
+            if x_groq is not None:
+                record_groq_usage('chat', getattr(x_groq, 'usage', None))
+            if chunk.choices and chunk.choices[0].delta.content:
+                if first_token:
+                    observe('visiontrack_stage_duration_seconds', time.perf_counter() - start, stage='groq_first_token')
+                    first_token = False
+                yield chunk.choices[0].delta.content
+
+
 # --- Roadmap Generation (Uses Groq) ---
-def generate_career_roadmap(session, history_text):
+# Roadmaps are requested in JSON mode and read pathway by pathway against the
+# schema for the user's status (see roadmap_schema.py). If some pathways are
+# missing or invalid, one small follow-up call asks for just those, so a
+# malformed response never costs a full regeneration.
+def get_roadmap_resume_context(session, history_text):
     """
-    Generates a career roadmap using the Groq API.
+    Returns the resume context most relevant to the whole conversation.
     """
     resume_context = "No resume provided for this session."
-    if session.resume_file and hasattr(session.resume_file, 'path'):
-        vector_store = process_resume(session.resume_file.path)
-        if vector_store:
-            # Find relevant text in the resume based on the entire conversation
-            relevant_chunks = vector_store.similarity_search(history_text, k=3)
-            resume_context = " ".join([chunk.page_content for chunk in relevant_chunks])
+    resume_hash = session.resume_hash
+    if not resume_hash and session.resume_file and hasattr(session.resume_file, 'path'):
+        # Sessions created before indexes were stored at upload time.
+        resume_hash = build_resume_index(session.resume_file.path)
+        if resume_hash:
+            session.resume_hash = resume_hash
+            session.save(update_fields=['resume_hash'])
+    if resume_hash:
+        # Find relevant text in the resume based on the entire conversation
+        resume_context = retrieve_resume_context(resume_hash, history_text, k=3) or resume_context
+    return resume_context
+
 
+def build_roadmap_prompt(session, history_text, resume_context):
+    """
+    Builds the roadmap prompt for a session.
+    """
+    schema = describe_pathway_schema(session.status)
     if session.status == 'school_student':
         prompt = f"""
         You are a JSON generation assistant. Analyze the following conversation and generate a JSON object.
@@ -122,10 +695,10 @@ def generate_career_roadmap(session, history_text):
         ---
         {history_text}
         ---
-        TASK: Based on the conversation, suggest 3 academic fields for the student.
+        TASK: Based on the conversation, suggest {ROADMAP_PATHWAY_COUNT} academic fields for the student.
         You MUST respond with ONLY a single, valid JSON object.
-        The JSON object must have a key "roadmap" which contains a list of 3 objects.
-        Each object MUST have these exact keys: "title" (string), "skills" (list of strings), "reasoning" (string).
+        The JSON object must have a key "roadmap" which contains a list of {ROADMAP_PATHWAY_COUNT} objects.
+        Each object MUST have exactly this shape: {schema}
         DO NOT add any text before or after the JSON object.
         """
     else:  # For college students and professionals
@@ -134,56 +707,186 @@ def generate_career_roadmap(session, history_text):
         Chat History: {history_text}
         Resume Context: {resume_context}
 
-        TASK: Based on this information, suggest 3 detailed career pathways.
+        TASK: Based on this information, suggest {ROADMAP_PATHWAY_COUNT} detailed career pathways.
         You MUST format your response as a single, valid JSON object.
-        The object must have one key "roadmap", a list of 3 pathway objects.
-        Each object must have these exact keys: "title", "skills", "courses_to_find", "salary", "growth", "reasoning".
+        The object must have one key "roadmap", a list of {ROADMAP_PATHWAY_COUNT} pathway objects.
+        Each object must have exactly this shape: {schema}
         - The "courses_to_find" value MUST be a list of 2-3 strings.
         - Each string MUST be a specific, searchable skill or course name (e.g., "User Interface Design", "UX Research Methods").
         """
+    return prompt
+
+
+def build_roadmap_repair_prompt(session, history_text, resume_context, pathways, missing):
+    """
+    Asks for only the `missing` pathways, given the valid ones already kept.
+    """
+    history_text = truncate_to_tokens(history_text, settings.PROMPT_HISTORY_TOKENS, keep_end=True)
+    kept_titles = ", ".join(f'"{pathway["title"]}"' for pathway in pathways) or "none"
+    resume_line = "" if session.status == 'school_student' else f"Resume Context: {resume_context}"
+    return f"""
+    You are completing a {'study' if session.status == 'school_student' else 'career'} roadmap for this user.
+    Chat History: {history_text}
+    {resume_line}
+
+    Pathways already chosen: {kept_titles}.
+    TASK: Suggest exactly {missing} more, different pathways.
+    Respond with ONLY a JSON object with one key "roadmap", a list of {missing} objects.
+    Each object must have exactly this shape: {describe_pathway_schema(session.status)}
+    """
 
+
+def _complete_roadmap_prompt(prompt: str, max_tokens: int, stage: str):
     # Groq API call for structured JSON generation
-    chat_completion = client.chat.completions.create(
-        messages=[
-            {"role": "user", "content": prompt}
-        ],
-        model="llama-3.1-8b-instant",
-        max_tokens=1500,
-        temperature=0.3
+    with span(stage):
+        chat_completion = create_chat_completion(
+            get_client(),
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            model="llama-3.1-8b-instant",
+            max_tokens=max_tokens,
+            temperature=0.3,
+            response_format={"type": "json_object"}
+        )
+    record_groq_usage('roadmap', chat_completion.usage)
+    return chat_completion.choices[0].message.content.strip()
+
+
+def generate_career_roadmap(session, history_text):
+    """
+    Generates a career roadmap using the Groq API.
+    """
+    resume_context = get_roadmap_resume_context(session, history_text)
+    prompt = build_roadmap_prompt(session, history_text, resume_context)
+
+    # A retried job sends the same prompt again; only complete, valid
+    # responses are cached, so a retry after a bad response asks again.
+    key = make_key(
+        "llama-3.1-8b-instant", [{"role": "user", "content": prompt}],
+        max_tokens=1500, temperature=0.3, response_format='json_object',
+    )
+    llm_output_text = get_or_create(
+        key,
+        lambda: _complete_roadmap_prompt(prompt, 1500, 'groq_roadmap'),
+        cacheable=lambda text: len(valid_pathways(text, session.status)) == ROADMAP_PATHWAY_COUNT,
     )
+    print("--- LLM Roadmap Response ---")
+    print(llm_output_text)
+    print("--------------------------")
+
+    with span('roadmap_parse'):
+        pathways = valid_pathways(llm_output_text, session.status)
+
+    missing = ROADMAP_PATHWAY_COUNT - len(pathways)
+    if missing:
+        print(f"Roadmap response had {len(pathways)} valid pathways; requesting {missing} more.")
+        repair_prompt = build_roadmap_repair_prompt(session, history_text, resume_context, pathways, missing)
+        try:
+            repair_text = _complete_roadmap_prompt(repair_prompt, 500 * missing, 'groq_roadmap_repair')
+        except LLMUnavailable as e:
+            if not pathways:
+                raise
+            # Better a roadmap with fewer pathways than none.
+            print(f"Keeping partial roadmap: {e}")
+            repair_text = ""
+        titles = {pathway['title'].lower() for pathway in pathways}
+        for pathway in valid_pathways(repair_text, session.status):
+            if len(pathways) < ROADMAP_PATHWAY_COUNT and pathway['title'].lower() not in titles:
+                titles.add(pathway['title'].lower())
+                pathways.append(pathway)
+
+    if not pathways:
+        return {"error": "Failed to decode or process the roadmap from AI response."}
+    data = {'roadmap': pathways}
+
+    if session.status != 'school_student':
+        # Look up every pathway's courses in one concurrent batch.
+        skills_to_find = [
+            skill_to_find
+            for pathway in data['roadmap']
+            for skill_to_find in pathway['courses_to_find']
+        ]
+        with span('youtube_lookup'):
+            found_courses = get_youtube_courses_bulk(skills_to_find, max_results=1)
+        for pathway in data['roadmap']:
+            verified_courses = []
+            for skill_to_find in pathway['courses_to_find']:
+                courses = found_courses.get(skill_to_find)
+                if courses:
+                    verified_courses.append(courses[0])
+            pathway['courses'] = verified_courses
+            del pathway['courses_to_find']
+
+    return data
+
+
+# --- Async Variants (ASGI) ---
+# Used by the async views. Groq calls are awaited instead of blocking a worker
+# thread. Anything that touches the ORM goes through sync_to_async on the
+# thread-sensitive path, where Django manages the connection; only work that
+# doesn't (query embedding, FAISS search, prompt formatting) runs in a worker
+# thread through asyncio.to_thread.
+async def achat_with_ai(context: dict, message: str, history: str):
+    """
+    Async version of chat_with_ai. The context must carry the resume_hash
+    (not a resume_path).
+    """
+    relevant_text = None
+    if needs_resume_search(context.get("resume_hash"), context.get("resume_profile"), message):
+        relevant_text = await aretrieve_resume_context(context["resume_hash"], message, k=2)
+    prompt = await asyncio.to_thread(format_chat_prompt, context, message, history, relevant_text)
+    return await acomplete_chat_prompt(prompt)
+
+
+async def aretrieve_resume_context(resume_hash: str, query: str, k: int):
+    """
+    Async version of retrieve_resume_context.
+    """
+    if settings.RESUME_INDEX_MODE == 'shared':
+        query_vector = await asyncio.to_thread(embed_query, query)
+        return await sync_to_async(_search_shared_store)(resume_hash, query_vector, k)
+
+    # Loading may rebuild the index from the stored text and cached chunk
+    # embeddings, which reads and writes the database.
+    vector_store = await sync_to_async(load_resume_index)(resume_hash)
+    if not vector_store:
+        return None
+    return await asyncio.to_thread(search_resume_index, vector_store, query, k)
+
+
+async def acomplete_chat_prompt(prompt: str):
+    """
+    Async version of complete_chat_prompt.
+    """
+    with span('groq_chat'):
+        chat_completion = await acreate_chat_completion(
+            get_async_client(),
+            messages=[
+                {"role": "user", "content": prompt}
+            ],
+            model="llama-3.1-8b-instant",
+            max_tokens=1000,
+            temperature=0.7
+        )
+    record_groq_usage('chat', chat_completion.usage)
+
+    return chat_completion.choices[0].message.content
+
+
+async def agenerate_welcome_message(context: dict):
+    """
+    Async version of generate_welcome_message.
+    """
+    name = context.get("name") or "there"
+    if settings.WELCOME_MESSAGE_SOURCE == 'template':
+        return render_welcome_template(context)
 
+    # No resume in the context, so building the prompt does no blocking work.
+    prompt = _welcome_prompt(context)
+    key = make_key("llama-3.1-8b-instant", [{"role": "user", "content": prompt}], max_tokens=1000, temperature=0.7)
     try:
-        llm_output_text = chat_completion.choices[0].message.content.strip()
-        print("--- LLM Roadmap Response ---")
-        print(llm_output_text)
-        print("--------------------------")
-
-        data = None
-        # Enhanced regex to find JSON within triple backticks
-        json_match = re.search(r'```(?:json)?\s*(\{.*?\})\s*```', llm_output_text, re.DOTALL)
-
-        if json_match:
-            json_string = json_match.group(1)
-            data = json.loads(json_string)
-        elif llm_output_text.startswith('{') and llm_output_text.endswith('}'):
-            # Fallback for when the model returns a raw JSON object
-            data = json.loads(llm_output_text)
-        else:
-            raise ValueError("Could not find or parse a valid JSON object in the AI's response.")
-
-        if session.status != 'school_student' and 'roadmap' in data:
-            for pathway in data['roadmap']:
-                verified_courses = []
-                if 'courses_to_find' in pathway:
-                    for skill_to_find in pathway['courses_to_find']:
-                        courses = get_youtube_courses(skill_to_find, max_results=1)
-                        if courses:
-                            verified_courses.append(courses[0])
-                pathway['courses'] = verified_courses
-                del pathway['courses_to_find']
-
-        return data
-
-    except (json.JSONDecodeError, TypeError, KeyError, ValueError) as e:
-        print(f"Error processing roadmap: {e}")
-        return {"error": "Failed to decode or process the roadmap from AI response."}
\ No newline at end of file
+        return _fill_name(await aget_or_create(key, lambda: acomplete_chat_prompt(prompt)), name)
+    except LLMUnavailable as e:
+        print(f"Using template welcome message: {e}")
+        return render_welcome_template(context)
@@ -0,0 +1,118 @@
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.management.benchmarking import percentile
+from api.models import ChatMessage, RoadmapJob, UserSession
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures SQLite write contention from concurrent chat turns, with Django's default "
+        "SQLite settings and with the tuned profile (WAL, busy timeout, IMMEDIATE transactions)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=16, help="Concurrent connections writing chat turns.")
+        parser.add_argument('--turns', type=int, default=50, help="Chat turns written per worker.")
+        parser.add_argument('--readers', type=int, default=4, help="Concurrent connections reading history.")
+        parser.add_argument('--profile', choices=['default', 'tuned', 'both'], default='both')
+
+    def handle(self, *args, **options):
+        profiles = ['default', 'tuned'] if options['profile'] == 'both' else [options['profile']]
+        with tempfile.TemporaryDirectory() as tmp:
+            for profile in profiles:
+                self._run_profile(profile, tmp, options)
+
+    def _run_profile(self, profile, tmp, options):
+        alias = f'benchmark_{profile}'
+        # Django's built-in defaults: rollback journal, 5 second timeout,
+        # deferred transactions.
+        db_options = {} if profile == 'default' else dict(settings.SQLITE_OPTIONS)
+        connections.settings[alias] = {
+            **connections['default'].settings_dict,
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(tmp, f'{alias}.sqlite3'),
+            'OPTIONS': db_options,
+            'CONN_MAX_AGE': 0,
+        }
+        call_command('migrate', database=alias, verbosity=0)
+        sessions = [
+            UserSession.objects.using(alias).create(name=f"Benchmark {i}", status='passout', age=25)
+            for i in range(options['workers'])
+        ]
+
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+        stop_reading = threading.Event()
+
+        def write_turns(session):
+            for turn in range(options['turns']):
+                start = time.perf_counter()
+                try:
+                    # Shaped like a chat turn that may queue a roadmap: a read,
+                    # then the two messages and the counter bump, in one
+                    # transaction.
+                    with transaction.atomic(using=alias):
+                        RoadmapJob.objects.using(alias).filter(session=session, status='pending').exists()
+                        ChatMessage.objects.using(alias).bulk_create([
+                            ChatMessage(session=session, sender='user', message=f"Message {turn}"),
+                            ChatMessage(session=session, sender='ai', message=f"Reply {turn} " * 40),
+                        ])
+                        UserSession.objects.using(alias).filter(pk=session.pk).update(
+                            message_count=F('message_count') + 2, updated_at=timezone.now()
+                        )
+                    with lock:
+                        latencies.append(time.perf_counter() - start)
+                except OperationalError as e:
+                    with lock:
+                        errors.append(str(e))
+            connections[alias].close()
+
+        def read_history():
+            reads = 0
+            while not stop_reading.is_set():
+                for session in sessions:
+                    try:
+                        list(ChatMessage.objects.using(alias).filter(session=session).order_by('-timestamp')[:20])
+                        reads += 1
+                    except OperationalError as e:
+                        with lock:
+                            errors.append(str(e))
+            connections[alias].close()
+            return reads
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['readers']) as read_pool:
+            reader_futures = [read_pool.submit(read_history) for _ in range(options['readers'])]
+            with ThreadPoolExecutor(max_workers=options['workers']) as write_pool:
+                list(write_pool.map(write_turns, sessions))
+            stop_reading.set()
+            reads = sum(future.result() for future in reader_futures)
+        elapsed = time.perf_counter() - start
+        connections[alias].close()
+
+        latencies.sort()
+        self.stdout.write(self.style.MIGRATE_HEADING(f"SQLite profile: {profile} {db_options or '(Django defaults)'}"))
+        self.stdout.write(
+            f"  turns written: {len(latencies)} in {elapsed:.2f}s ({len(latencies) / elapsed:.1f}/s), "
+            f"history reads: {reads}"
+        )
+        self.stdout.write(
+            f"  write latency ms: p50 {percentile(latencies, 50) * 1000:.1f}, "
+            f"p95 {percentile(latencies, 95) * 1000:.1f}, p99 {percentile(latencies, 99) * 1000:.1f}"
+        )
+        style = self.style.ERROR if errors else self.style.SUCCESS
+        self.stdout.write(style(f"  errors: {len(errors)}"))
+        for message in sorted(set(errors)):
+            self.stdout.write(f"    {errors.count(message)} x {message}")
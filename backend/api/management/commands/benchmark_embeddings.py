@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api.embedding_service import EmbeddingServer, RemoteEmbeddings
+
+
+class SimulatedEmbeddings:
+    """
+    Stand-in model with a fixed cost per forward pass plus a cost per text,
+    which is the shape that makes batching pay off on a real model.
+    """
+
+    def __init__(self, call_ms, per_text_ms, dim=384):
+        self.call_ms = call_ms
+        self.per_text_ms = per_text_ms
+        self.dim = dim
+
+    def embed_documents(self, texts):
+        time.sleep((self.call_ms + self.per_text_ms * len(texts)) / 1000)
+        return [[0.0] * self.dim for _ in texts]
+
+
+class Command(BaseCommand):
+    help = "Measures embedding throughput through the embedding service with and without micro-batching."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uploads', type=int, default=64, help="Number of simulated resume uploads.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Uploads in flight at once.")
+        parser.add_argument('--chunks', type=int, default=4, help="Chunks embedded per upload.")
+        parser.add_argument('--max-batch', type=int, default=64)
+        parser.add_argument('--max-wait-ms', type=float, default=10.0)
+        parser.add_argument('--simulated', action='store_true',
+                            help="Use a simulated model instead of loading sentence-transformers.")
+        parser.add_argument('--call-ms', type=float, default=20.0, help="Simulated cost per forward pass.")
+        parser.add_argument('--per-text-ms', type=float, default=2.0, help="Simulated cost per text.")
+
+    def handle(self, *args, **options):
+        if options['simulated']:
+            model = SimulatedEmbeddings(options['call_ms'], options['per_text_ms'])
+        else:
+            from api.llm_engine import load_local_embeddings
+            model = load_local_embeddings()
+
+        chunk = "Experienced analyst with a background in data pipelines and reporting. " * 14
+        uploads = [[f"{i}-{j} {chunk}" for j in range(options['chunks'])] for i in range(options['uploads'])]
+
+        unbatched = self._run(model, uploads, options['concurrency'], max_batch=1, max_wait=0)
+        batched = self._run(model, uploads, options['concurrency'],
+                            max_batch=options['max_batch'], max_wait=options['max_wait_ms'] / 1000)
+
+        self.stdout.write(f"{'mode':<10} {'seconds':>8} {'uploads/s':>10} {'batches':>8}")
+        for name, (elapsed, batches) in (('unbatched', unbatched), ('batched', batched)):
+            self.stdout.write(f"{name:<10} {elapsed:>8.2f} {len(uploads) / elapsed:>10.1f} {batches:>8}")
+        self.stdout.write(self.style.SUCCESS(f"Speedup from batching: {unbatched[0] / batched[0]:.2f}x"))
+
+    def _run(self, model, uploads, concurrency, max_batch, max_wait):
+        socket_path = os.path.join(tempfile.mkdtemp(), 'embeddings.sock')
+        server = EmbeddingServer(socket_path, model, max_batch=max_batch, max_wait=max_wait)
+        with ThreadPoolExecutor(max_workers=1) as server_thread:
+            server_thread.submit(server.serve_forever)
+            try:
+                client = RemoteEmbeddings(socket_path)
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                    list(pool.map(client.embed_documents, uploads))
+                elapsed = time.perf_counter() - start
+            finally:
+                server.shutdown()
+                server.server_close()
+        return elapsed, server.batcher.batches
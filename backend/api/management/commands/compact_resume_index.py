@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.llm_engine import shared_resume_store
+
+
+class Command(BaseCommand):
+    help = "Drops chunks of resumes no session uses any more from the shared resume index."
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        kept, removed = shared_resume_store.compact()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f"Shared resume index compacted in {elapsed:.2f}s: {kept} chunks kept, {removed} removed."
+        ))
@@ -0,0 +1,234 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+import httpx
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.test.utils import override_settings
+
+from api import groq_client, llm_engine, youtube
+from api.db_router import REPLICA_ALIAS
+from api.fake_upstreams import FakeUpstreamConfig, FakeUpstreamServer
+from api.jobs import run_worker
+from api.management.benchmarking import percentile
+from api.shared_index import SharedVectorStore
+
+
+class _ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Replays full user sessions (questionnaire, chat turns, resume upload, roadmap) "
+        "against the API and reports latency percentiles and throughput per endpoint. "
+        "Without --base-url, runs the app, a roadmap worker and fake Groq/YouTube "
+        "upstreams in this process, so no network access is needed, against a scratch "
+        "database and media directory that are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', help="Test an already running server instead of an in-process one.")
+        parser.add_argument('--sessions', type=int, default=20, help="Number of sessions to replay.")
+        parser.add_argument('--concurrency', type=int, default=5, help="Sessions replayed at once.")
+        parser.add_argument('--messages', type=int, default=5, help="Chat turns per session.")
+        parser.add_argument('--resume', help="PDF uploaded in every session; skipped when not given.")
+        parser.add_argument('--stream', action='store_true', help="Send chat turns to the streaming endpoint.")
+        parser.add_argument('--output', help="Also write the report as JSON to this path.")
+        parser.add_argument('--latency-ms', type=float, default=200.0, help="Fake Groq latency (in-process only).")
+        parser.add_argument('--tokens-per-second', type=float, default=400.0,
+                            help="Fake Groq generation speed (in-process only).")
+        parser.add_argument('--youtube-latency-ms', type=float, default=80.0,
+                            help="Fake YouTube latency (in-process only).")
+        parser.add_argument('--upstream-rpm', type=int, default=0,
+                            help="Fake Groq quota, answered with 429s once exceeded (in-process only).")
+        parser.add_argument('--groq-rpm', type=int, default=0,
+                            help="Client-side Groq request limit; 0 disables it (in-process only).")
+        parser.add_argument('--groq-tpm', type=int, default=0,
+                            help="Client-side Groq token limit; 0 disables it (in-process only).")
+
+    def handle(self, *args, **options):
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.lock = threading.Lock()
+
+        servers = []
+        scratch = None
+        base_url = options['base_url']
+        if not base_url:
+            scratch = tempfile.TemporaryDirectory(prefix='loadtest-')
+            self._use_scratch_storage(scratch.name)
+            base_url, servers = self._start_in_process(options)
+
+        start = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                list(pool.map(lambda i: self._replay_session(base_url, i, options), range(options['sessions'])))
+        finally:
+            elapsed = time.perf_counter() - start
+            for server in servers:
+                server.shutdown()
+                server.server_close()
+            if scratch is not None:
+                connections.close_all()
+                scratch.cleanup()
+
+        self._report(elapsed, options)
+
+    def _use_scratch_storage(self, root):
+        """
+        Points the default database, uploads and resume indexes at `root`, so
+        an in-process run never writes its sessions into the real ones.
+        """
+        connections.close_all()
+        # Reads routed to a configured replica would miss the scratch data.
+        connections.settings.pop(REPLICA_ALIAS, None)
+        settings.DATABASES.pop(REPLICA_ALIAS, None)
+        connections.settings['default'].update({
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.path.join(root, 'loadtest.sqlite3'),
+            'OPTIONS': dict(settings.SQLITE_OPTIONS),
+        })
+        # Drop this thread's connection object; it may be for another engine.
+        del connections['default']
+        call_command('migrate', verbosity=0)
+        call_command('createcachetable', verbosity=0)
+
+        override_settings(
+            MEDIA_ROOT=os.path.join(root, 'media'),
+            RESUME_INDEX_ROOT=os.path.join(root, 'resume_index'),
+            RESUME_SHARED_INDEX_ROOT=os.path.join(root, 'resume_index_shared'),
+        ).enable()
+        llm_engine.shared_resume_store = SharedVectorStore(settings.RESUME_SHARED_INDEX_ROOT)
+        self.stdout.write(f"Scratch database and media under {root}")
+
+    def _start_in_process(self, options):
+        upstreams = FakeUpstreamServer(('127.0.0.1', 0), FakeUpstreamConfig(
+            latency_ms=options['latency_ms'],
+            tokens_per_second=options['tokens_per_second'],
+            youtube_latency_ms=options['youtube_latency_ms'],
+            requests_per_minute=options['upstream_rpm'],
+        ))
+        upstreams.start_in_background()
+        settings.GROQ_BASE_URL = upstreams.url
+        settings.YOUTUBE_API_ENDPOINT = upstreams.url
+        settings.GROQ_REQUESTS_PER_MINUTE = options['groq_rpm']
+        settings.GROQ_TOKENS_PER_MINUTE = options['groq_tpm']
+        # Fresh limiter state, not shared with real workers on this host.
+        settings.GROQ_RATE_LIMIT_FILE = os.path.join(tempfile.mkdtemp(), 'groq-ratelimit.json')
+        # Drop any clients and limiter already built against the real services.
+        llm_engine._client = llm_engine._async_client = None
+        groq_client._limiter = None
+        youtube._youtube = None
+
+        app = make_server('127.0.0.1', 0, get_wsgi_application(),
+                          server_class=_ThreadingWSGIServer, handler_class=_QuietHandler)
+        threading.Thread(target=app.serve_forever, name='loadtest-app', daemon=True).start()
+        threading.Thread(target=run_worker, kwargs={'poll_interval': 0.2}, name='loadtest-worker', daemon=True).start()
+
+        self.stdout.write(f"Fake upstreams at {upstreams.url}; app at http://127.0.0.1:{app.server_port}")
+        return f"http://127.0.0.1:{app.server_port}", [app, upstreams]
+
+    def _timed(self, endpoint, func):
+        start = time.perf_counter()
+        try:
+            response = func()
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.timings[endpoint].append(elapsed)
+            if not ok:
+                self.errors[endpoint] += 1
+        return response if ok else None
+
+    def _replay_session(self, base_url, index, options):
+        with httpx.Client(base_url=f"{base_url}/api", timeout=120.0) as client:
+            response = self._timed('submit_questionnaire', lambda: client.post('/submit_questionnaire/', json={
+                'status': 'college_student' if options['resume'] else 'school_student',
+                'name': f"Load Test {index}",
+                'age': 20,
+            }))
+            if response is None:
+                return
+            session_id = response.json()['session_id']
+
+            for turn in range(options['messages']):
+                payload = {'session_id': session_id, 'message': f"Turn {turn}: {uuid.uuid4().hex} what should I study?"}
+                if options['stream']:
+                    self._timed('send_message_stream', lambda: self._consume_stream(client, payload))
+                else:
+                    self._timed('send_message', lambda: client.post('/send_message/', json=payload))
+                self._timed('get_chat_history', lambda: client.get(f'/get_chat_history/{session_id}/'))
+
+            if options['resume']:
+                with open(options['resume'], 'rb') as f:
+                    resume = f.read()
+                self._timed('upload_resume', lambda: client.post(
+                    '/resume/upload/', data={'session_id': session_id},
+                    files={'resume': ('resume.pdf', resume, 'application/pdf')},
+                ))
+
+            self._timed('send_message', lambda: client.post('/send_message/', json={
+                'session_id': session_id, 'message': "Please make my career roadmap.",
+            }))
+            # The roadmap is generated in the background; the total wait is
+            # what the user experiences.
+            deadline = time.perf_counter() + 120
+            start = time.perf_counter()
+            while time.perf_counter() < deadline:
+                response = self._timed('get_roadmap', lambda: client.get(f'/roadmap/{session_id}/', params={'wait': 25}))
+                if response is None or response.status_code != 202:
+                    break
+                # Only async views hold the request open; the sync one asks
+                # us to come back later.
+                time.sleep(float(response.headers.get('Retry-After', 0)))
+            with self.lock:
+                self.timings['roadmap_ready'].append(time.perf_counter() - start)
+
+    def _consume_stream(self, client, payload):
+        with client.stream('POST', '/send_message/stream/', json=payload) as response:
+            for _ in response.iter_bytes():
+                pass
+        return response
+
+    def _report(self, elapsed, options):
+        report = {'elapsed_seconds': round(elapsed, 3), 'sessions': options['sessions'], 'endpoints': {}}
+        self.stdout.write(f"\n{'endpoint':<22} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+        for endpoint in sorted(self.timings):
+            values = sorted(self.timings[endpoint])
+            stats = {
+                'count': len(values),
+                'errors': self.errors[endpoint],
+                'p50_ms': round(percentile(values, 50) * 1000, 1),
+                'p95_ms': round(percentile(values, 95) * 1000, 1),
+                'p99_ms': round(percentile(values, 99) * 1000, 1),
+                'rps': round(len(values) / elapsed, 2),
+            }
+            report['endpoints'][endpoint] = stats
+            self.stdout.write(
+                f"{endpoint:<22} {stats['count']:>6} {stats['errors']:>6} {stats['p50_ms']:>9} "
+                f"{stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['rps']:>8}"
+            )
+        self.stdout.write(f"\n{options['sessions']} sessions in {elapsed:.2f}s")
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.embedding_service import EmbeddingServer
+from api.llm_engine import load_local_embeddings
+
+
+class Command(BaseCommand):
+    help = "Runs the shared embedding service on a Unix socket."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--socket', default=settings.EMBEDDING_SERVICE_SOCKET,
+                            help="Socket path (defaults to EMBEDDING_SERVICE_SOCKET).")
+        parser.add_argument('--max-batch', type=int, default=64,
+                            help="Maximum number of texts embedded in one batch.")
+        parser.add_argument('--max-wait-ms', type=float, default=10.0,
+                            help="How long a batch waits for more requests before it is flushed.")
+
+    def handle(self, *args, **options):
+        if not options['socket']:
+            raise CommandError("No socket path given; pass --socket or set EMBEDDING_SERVICE_SOCKET.")
+
+        model = load_local_embeddings()
+        server = EmbeddingServer(
+            options['socket'], model,
+            max_batch=options['max_batch'],
+            max_wait=options['max_wait_ms'] / 1000,
+        )
+        self.stdout.write(f"Embedding service listening on {options['socket']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from api.fake_upstreams import FakeUpstreamConfig, FakeUpstreamServer
+
+
+class Command(BaseCommand):
+    help = "Runs local stand-ins for the Groq and YouTube APIs for offline load testing."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8900)
+        parser.add_argument('--latency-ms', type=float, default=200.0,
+                            help="Fixed delay before each completion starts.")
+        parser.add_argument('--tokens-per-second', type=float, default=400.0,
+                            help="Simulated generation speed.")
+        parser.add_argument('--reply-tokens', type=int, default=80,
+                            help="Length of generated chat replies.")
+        parser.add_argument('--youtube-latency-ms', type=float, default=80.0)
+        parser.add_argument('--requests-per-minute', type=int, default=0,
+                            help="Completions quota answered with 429s once exceeded; 0 for none.")
+
+    def handle(self, *args, **options):
+        config = FakeUpstreamConfig(
+            latency_ms=options['latency_ms'],
+            tokens_per_second=options['tokens_per_second'],
+            reply_tokens=options['reply_tokens'],
+            youtube_latency_ms=options['youtube_latency_ms'],
+            requests_per_minute=options['requests_per_minute'],
+        )
+        server = FakeUpstreamServer((options['host'], options['port']), config)
+        self.stdout.write(f"Fake upstreams listening on {server.url}")
+        self.stdout.write(f"  GROQ_BASE_URL={server.url}")
+        self.stdout.write(f"  YOUTUBE_API_ENDPOINT={server.url}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,39 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.lifecycle import archive_inactive_sessions, delete_orphaned_artifacts, enforce_disk_quota
+
+
+class Command(BaseCommand):
+    help = "Archives inactive sessions, deletes orphaned resume files and indexes, and enforces the resume disk quota."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--archive-after-days', type=int, default=settings.SESSION_ARCHIVE_AFTER_DAYS,
+                            help="Archive sessions idle for this many days.")
+        parser.add_argument('--quota-bytes', type=int, default=settings.RESUME_DISK_QUOTA_BYTES,
+                            help="Disk quota for resume files and indexes; 0 disables it.")
+        parser.add_argument('--batch-size', type=int, default=settings.LIFECYCLE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.1,
+                            help="Seconds to pause between batches, leaving the database to live traffic.")
+
+    def handle(self, *args, **options):
+        batch_size, pause = options['batch_size'], options['pause']
+
+        start = time.perf_counter()
+        archived = archive_inactive_sessions(options['archive_after_days'], batch_size, pause)
+        self.stdout.write(f"Archived {archived} sessions idle for {options['archive_after_days']}+ days.")
+
+        removed = delete_orphaned_artifacts(batch_size, pause)
+        self.stdout.write(
+            f"Removed orphans: {removed['files']} resume files, {removed['indexes']} indexes, "
+            f"{removed['documents']} documents, {removed['chunks']} shared index chunks."
+        )
+
+        used, freed = enforce_disk_quota(options['quota_bytes'], batch_size, pause)
+        self.stdout.write(
+            f"Resume storage: {used / 1024 / 1024:.1f} MB used, {freed / 1024 / 1024:.1f} MB evicted "
+            f"(quota {options['quota_bytes'] / 1024 / 1024:.0f} MB)."
+        )
+        self.stdout.write(self.style.SUCCESS(f"Lifecycle run finished in {time.perf_counter() - start:.2f}s."))
@@ -0,0 +1,39 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from api.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Runs background workers that generate queued career roadmaps."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help="Number of worker processes to run.")
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds to wait between checks of an empty queue.")
+        parser.add_argument('--once', action='store_true', help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        kwargs = {'poll_interval': options['poll_interval'], 'once': options['once']}
+        if options['processes'] <= 1:
+            self.stdout.write("Roadmap worker started.")
+            run_worker(**kwargs)
+            return
+
+        # Child processes must open their own database connections.
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=run_worker, kwargs=kwargs, name=f"roadmap-worker-{i}")
+            for i in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(f"Started {len(workers)} roadmap worker processes.")
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.llm_engine import warm_up
+
+
+class Command(BaseCommand):
+    help = "Loads the embedding model and Groq client ahead of the first request."
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        warm_up()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(f"Models warmed up in {elapsed:.2f}s."))
@@ -0,0 +1,148 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.http import Http404, HttpResponse
+
+# In-process metrics in the Prometheus text format, without a client library.
+# Each worker process keeps its own counters, so with several workers a scrape
+# of /metrics reports the worker that served it; label scrapes per worker (or
+# run one worker per port) to see them all.
+#
+# `span(stage)` times one stage of a request. Durations feed a histogram per
+# stage and, when the stage runs inside a request, that request's
+# Server-Timing header (see middleware.ServerTimingMiddleware).
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+_help = {}        # name -> (type, help text)
+_collectors = []
+
+# Stage timings of the request being handled, as a list of (stage, seconds).
+# Unset outside requests (workers, management commands).
+request_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def describe(name, metric_type, text):
+    _help[name] = (metric_type, text)
+
+
+def inc(name, amount=1, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    key = (name, _labels(labels))
+    with _lock:
+        state = _histograms.get(key)
+        if state is None:
+            state = _histograms[key] = [0] * (len(DURATION_BUCKETS) + 2)
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if value <= bound:
+                state[i] += 1
+        state[-2] += value
+        state[-1] += 1
+
+
+def register_collector(collector):
+    """
+    Registers a function called at scrape time that returns extra
+    (name, type, help, [(labels dict, value), ...]) metrics, for values
+    that already live elsewhere, such as a cache's own counters.
+    """
+    _collectors.append(collector)
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe('visiontrack_stage_duration_seconds', elapsed, stage=stage)
+        timings = request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def record_groq_usage(call, usage):
+    """
+    Counts the tokens reported in a Groq response's usage data.
+    """
+    if usage is None:
+        return
+    inc('visiontrack_groq_tokens_total', getattr(usage, 'prompt_tokens', 0) or 0, call=call, type='prompt')
+    inc('visiontrack_groq_tokens_total', getattr(usage, 'completion_tokens', 0) or 0, call=call, type='completion')
+
+
+def record_cache_lookup(cache, result):
+    inc('visiontrack_cache_lookups_total', cache=cache, result=result)
+
+
+describe('visiontrack_stage_duration_seconds', 'histogram', "Time spent in each processing stage.")
+describe('visiontrack_request_duration_seconds', 'histogram', "Time to produce a response, per view.")
+describe('visiontrack_groq_tokens_total', 'counter', "Tokens reported by Groq, per call type.")
+describe('visiontrack_cache_lookups_total', 'counter', "Cache lookups by cache and result.")
+
+
+# --- Exposition ---
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """
+    Returns all metrics in the Prometheus text exposition format.
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(state) for key, state in _histograms.items()}
+
+    series = {}  # name -> list of lines
+    for (name, labels), value in sorted(counters.items()):
+        series.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    for (name, labels), state in sorted(histograms.items()):
+        lines = series.setdefault(name, [])
+        for bound, count in zip(DURATION_BUCKETS, state):
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {count}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {state[-1]}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(state[-2])}")
+        lines.append(f"{name}_count{_format_labels(labels)} {state[-1]}")
+
+    output = []
+    for name, lines in series.items():
+        metric_type, text = _help.get(name, ('untyped', name))
+        output += [f"# HELP {name} {text}", f"# TYPE {name} {metric_type}", *lines]
+    for collector in _collectors:
+        for name, metric_type, text, samples in collector():
+            output += [f"# HELP {name} {text}", f"# TYPE {name} {metric_type}"]
+            output += [f"{name}{_format_labels(_labels(labels))} {_format_value(value)}" for labels, value in samples]
+    return "\n".join(output) + "\n"
+
+
+def metrics_view(request):
+    if not settings.METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
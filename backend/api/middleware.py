@@ -0,0 +1,196 @@
+import json
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+
+from . import metrics
+from .admission import Rejected, get_admission_controller, record_admission, record_rejection
+
+
+class ServerTimingMiddleware:
+    """
+    Times every request, records the duration per view, and reports the
+    stages timed with metrics.span() in a Server-Timing header. Repeated
+    stages are summed. For streaming responses the header is sent before the
+    body, so it only covers the work done before streaming started.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings = []
+        token = metrics.request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.request_timings.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timings = []
+        token = metrics.request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.request_timings.reset(token)
+        return self._finish(request, response, timings, time.perf_counter() - start)
+
+    def _finish(self, request, response, timings, elapsed):
+        match = request.resolver_match
+        metrics.observe(
+            'visiontrack_request_duration_seconds', elapsed,
+            view=(match.url_name or match.view_name) if match else 'unresolved',
+            method=request.method,
+            status=response.status_code,
+        )
+
+        totals = {}
+        for stage, seconds in timings:
+            totals[stage] = totals.get(stage, 0) + seconds
+        entries = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items()]
+        entries.append(f"total;dur={elapsed * 1000:.1f}")
+        response['Server-Timing'] = ", ".join(entries)
+        return response
+
+
+# Views whose requests wait on Groq, by URL name.
+ADMISSION_CONTROLLED_VIEWS = {'submit_questionnaire', 'send_message', 'send_message_stream', 'upload_resume'}
+
+# JSON bodies up to this size are read to find the session id; multipart
+# uploads are never read here, so they stay streamed.
+_SESSION_BODY_LIMIT = 64 * 1024
+
+
+class AdmissionControlMiddleware:
+    """
+    Limits concurrent requests to the LLM-bound views (see admission.py).
+    Turned-away requests get a 429 (the session already has a turn running)
+    or a 503 (the queue is full or the wait ran out), with Retry-After.
+    Streaming responses hold their slot until the stream ends.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _controlled(self, request):
+        if not settings.ADMISSION_CONTROL_ENABLED or request.method != 'POST':
+            return False
+        try:
+            return resolve(request.path_info).url_name in ADMISSION_CONTROLLED_VIEWS
+        except Resolver404:
+            return False
+
+    def _session_key(self, request):
+        if request.content_type != 'application/json':
+            return None
+        try:
+            if int(request.META.get('CONTENT_LENGTH') or 0) > _SESSION_BODY_LIMIT:
+                return None
+            session_id = json.loads(request.body).get('session_id')
+        except (ValueError, AttributeError):
+            return None
+        return str(session_id) if session_id else None
+
+    def _rejected_response(self, error):
+        record_rejection(error.reason)
+        if error.reason == 'session_busy':
+            message = 'Your previous message is still being answered. Please wait for the reply.'
+        else:
+            message = 'The counselor is busy right now. Please try again shortly.'
+        response = JsonResponse({'success': False, 'error': message}, status=error.status)
+        response['Retry-After'] = str(error.retry_after)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._controlled(request):
+            return self.get_response(request)
+
+        controller = get_admission_controller()
+        session_key = self._session_key(request)
+        try:
+            wait = controller.acquire(session_key)
+        except Rejected as e:
+            return self._rejected_response(e)
+        record_admission(wait)
+
+        start = time.perf_counter()
+
+        def release():
+            controller.release(session_key, time.perf_counter() - start)
+
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            release()
+            raise
+        if response.streaming:
+            response.streaming_content = _release_after(response.streaming_content, release)
+        else:
+            release()
+        return response
+
+    async def __acall__(self, request):
+        if not self._controlled(request):
+            return await self.get_response(request)
+
+        controller = get_admission_controller()
+        session_key = self._session_key(request)
+        try:
+            wait = await controller.aacquire(session_key)
+        except Rejected as e:
+            return self._rejected_response(e)
+        record_admission(wait)
+
+        start = time.perf_counter()
+
+        def release():
+            controller.release(session_key, time.perf_counter() - start)
+
+        try:
+            response = await self.get_response(request)
+        except BaseException:
+            release()
+            raise
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = _arelease_after(response.streaming_content, release)
+            else:
+                response.streaming_content = _release_after(response.streaming_content, release)
+        else:
+            release()
+        return response
+
+
+def _release_after(content, release):
+    try:
+        yield from content
+    finally:
+        release()
+
+
+async def _arelease_after(content, release):
+    try:
+        async for part in content:
+            yield part
+    finally:
+        release()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_usersession_roadmap_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersession',
+            name='resume_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_usersession_resume_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersession',
+            name='history_summary',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='usersession',
+            name='summarized_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_usersession_history_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='YouTubeCourseCache',
+            fields=[
+                ('cache_key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('skill', models.CharField(max_length=255)),
+                ('max_results', models.IntegerField()),
+                ('results', models.JSONField()),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'verbose_name': 'YouTube Course Cache Entry',
+                'verbose_name_plural': 'YouTube Course Cache Entries',
+                'db_table': 'youtube_course_cache',
+            },
+        ),
+    ]
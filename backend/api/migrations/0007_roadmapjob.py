@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:23
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_youtubecoursecache'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoadmapJob',
+            fields=[
+                ('job_id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.IntegerField(default=0)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, max_length=100, null=True)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('session', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='roadmap_jobs', to='api.usersession')),
+            ],
+            options={
+                'verbose_name': 'Roadmap Job',
+                'verbose_name_plural': 'Roadmap Jobs',
+                'db_table': 'roadmap_jobs',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['status', 'run_after'], name='roadmap_job_status_f7bdce_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 11:40
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_message_count(apps, schema_editor):
+    UserSession = apps.get_model('api', 'UserSession')
+    ChatMessage = apps.get_model('api', 'ChatMessage')
+    counts = (
+        ChatMessage.objects.filter(session=OuterRef('pk'))
+        .values('session').annotate(count=Count('pk')).values('count')
+    )
+    UserSession.objects.update(message_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_roadmapjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usersession',
+            name='message_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_message_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_usersession_message_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumeDocument',
+            fields=[
+                ('content_hash', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('text', models.TextField(blank=True)),
+                ('page_count', models.IntegerField(default=0)),
+                ('truncated', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Resume Document',
+                'verbose_name_plural': 'Resume Documents',
+                'db_table': 'resume_documents',
+            },
+        ),
+    ]
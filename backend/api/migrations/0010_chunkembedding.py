@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_resumedocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChunkEmbedding',
+            fields=[
+                ('cache_key', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('model_name', models.CharField(max_length=200)),
+                ('vector', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Chunk Embedding',
+                'verbose_name_plural': 'Chunk Embeddings',
+                'db_table': 'chunk_embeddings',
+            },
+        ),
+    ]
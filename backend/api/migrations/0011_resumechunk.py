@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_chunkembedding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumeChunk',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('resume_hash', models.CharField(db_index=True, max_length=64)),
+                ('position', models.IntegerField()),
+                ('text', models.TextField()),
+                ('generation', models.IntegerField()),
+                ('row', models.BigIntegerField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Resume Chunk',
+                'verbose_name_plural': 'Resume Chunks',
+                'db_table': 'resume_chunks',
+                'ordering': ['resume_hash', 'position'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_resumechunk'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='resumedocument',
+            name='profile',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='usersession',
+            name='resume_profile',
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
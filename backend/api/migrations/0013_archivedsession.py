@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_resume_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSession',
+            fields=[
+                ('session_id', models.UUIDField(primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=100)),
+                ('status', models.CharField(max_length=20)),
+                ('message_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField()),
+                ('last_active_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('data', models.BinaryField()),
+            ],
+            options={
+                'verbose_name': 'Archived Session',
+                'verbose_name_plural': 'Archived Sessions',
+                'db_table': 'archived_sessions',
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-17 21:15
+
+from django.db import migrations, models
+
+
+def fail_duplicate_active_jobs(apps, schema_editor):
+    # Concurrent turns could queue two jobs for one session; keep the oldest
+    # active one so the constraint can be added.
+    RoadmapJob = apps.get_model('api', 'RoadmapJob')
+    seen = set()
+    duplicates = []
+    active = RoadmapJob.objects.filter(status__in=('pending', 'running')).order_by('created_at')
+    for job_id, session_id in active.values_list('job_id', 'session_id').iterator():
+        if session_id in seen:
+            duplicates.append(job_id)
+        seen.add(session_id)
+    RoadmapJob.objects.filter(job_id__in=duplicates).update(
+        status='failed', last_error='Duplicate of an earlier job for the same session.'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_archivedsession'),
+    ]
+
+    operations = [
+        migrations.RunPython(fail_duplicate_active_jobs, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='roadmapjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('pending', 'running'))), fields=('session',), name='one_active_roadmap_job_per_session'),
+        ),
+    ]
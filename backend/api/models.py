@@ -1,4 +1,9 @@
-from django.db import models
+import json
+import zlib
+
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 import uuid
 
 class UserSession(models.Model):
@@ -19,9 +24,20 @@ class UserSession(models.Model):
     # MODIFIED: Concerns is now optional as it will be gathered during the chat.
     concerns = models.TextField(blank=True, null=True)
     resume_file = models.FileField(upload_to='resumes/', blank=True, null=True)
+    # SHA-256 of the resume contents; names the stored vector index.
+    resume_hash = models.CharField(max_length=64, blank=True, null=True)
+    # Structured resume profile, used in chat prompts instead of retrieving
+    # resume chunks on every turn.
+    resume_profile = models.JSONField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     roadmap_data = models.JSONField(null=True, blank=True)
+    # Running summary of the messages up to and including `summarized_until`;
+    # only later messages are sent to the LLM verbatim.
+    history_summary = models.TextField(blank=True, null=True)
+    summarized_until = models.DateTimeField(blank=True, null=True)
+    # Number of ChatMessages in the session, kept up to date by add_messages().
+    message_count = models.IntegerField(default=0)
 
     class Meta:
         db_table = 'user_sessions'
@@ -31,6 +47,21 @@ class UserSession(models.Model):
     def __str__(self):
         return f"{self.name} - {self.get_status_display()}"
 
+    def add_messages(self, *messages):
+        """
+        Saves (sender, text) pairs as ChatMessages and bumps message_count in a
+        single transaction. Returns the created messages.
+        """
+        with transaction.atomic():
+            created = ChatMessage.objects.bulk_create([
+                ChatMessage(session=self, sender=sender, message=text) for sender, text in messages
+            ])
+            UserSession.objects.filter(pk=self.pk).update(
+                message_count=F('message_count') + len(created), updated_at=timezone.now()
+            )
+        self.message_count += len(created)
+        return created
+
 class ChatMessage(models.Model):
     SENDER_CHOICES = [('user', 'User'), ('ai', 'AI')]
 
@@ -50,3 +81,136 @@ class ChatMessage(models.Model):
     def __str__(self):
         return f"{self.session.name} - {self.get_sender_display()}: {self.message[:50]}..."
 
+class RoadmapJob(models.Model):
+    STATUS_CHOICES = [('pending', 'Pending'), ('running', 'Running'), ('ready', 'Ready'), ('failed', 'Failed')]
+    # Jobs still to produce a roadmap; a session has at most one of these.
+    ACTIVE_STATUSES = ('pending', 'running')
+
+    job_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    session = models.ForeignKey(UserSession, on_delete=models.CASCADE, related_name='roadmap_jobs')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    # Earliest time a worker may pick the job up (pushed back between retries).
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, null=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'roadmap_jobs'
+        ordering = ['created_at']
+        indexes = [models.Index(fields=['status', 'run_after'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['session'],
+                condition=models.Q(status__in=('pending', 'running')),
+                name='one_active_roadmap_job_per_session',
+            ),
+        ]
+        verbose_name = 'Roadmap Job'
+        verbose_name_plural = 'Roadmap Jobs'
+
+    def __str__(self):
+        return f"{self.session.name} - {self.get_status_display()}"
+
+class YouTubeCourseCache(models.Model):
+    # SHA-256 of max_results and the normalized skill text.
+    cache_key = models.CharField(max_length=64, primary_key=True)
+    skill = models.CharField(max_length=255)
+    max_results = models.IntegerField()
+    results = models.JSONField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'youtube_course_cache'
+        verbose_name = 'YouTube Course Cache Entry'
+        verbose_name_plural = 'YouTube Course Cache Entries'
+
+    def __str__(self):
+        return f"{self.skill} ({len(self.results)} results)"
+
+class ResumeDocument(models.Model):
+    # Text extracted from an uploaded resume, stored once per distinct file so
+    # chunking and prompts never have to reopen the PDF.
+    content_hash = models.CharField(max_length=64, primary_key=True)  # SHA-256 of the file
+    text = models.TextField(blank=True)
+    page_count = models.IntegerField(default=0)
+    # True if extraction stopped early at a page, size or time limit.
+    truncated = models.BooleanField(default=False)
+    # Structured summary (summary, skills, education, experience), built on
+    # first use; see llm_engine.get_resume_profile().
+    profile = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'resume_documents'
+        verbose_name = 'Resume Document'
+        verbose_name_plural = 'Resume Documents'
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} ({self.page_count} pages)"
+
+class ChunkEmbedding(models.Model):
+    # Embedding vectors of resume chunks, shared by every resume containing
+    # the same chunk text. The key is the SHA-256 of the model name and text.
+    cache_key = models.CharField(max_length=64, primary_key=True)
+    model_name = models.CharField(max_length=200)
+    vector = models.BinaryField()  # float32, native byte order
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'chunk_embeddings'
+        verbose_name = 'Chunk Embedding'
+        verbose_name_plural = 'Chunk Embeddings'
+
+    def __str__(self):
+        return f"{self.model_name} {self.cache_key[:12]}"
+
+class ResumeChunk(models.Model):
+    # A chunk of resume text in the shared vector store (RESUME_INDEX_MODE =
+    # 'shared'). Its vector is row `row` of the store's vector file for
+    # `generation`; compaction rewrites both.
+    resume_hash = models.CharField(max_length=64, db_index=True)
+    position = models.IntegerField()
+    text = models.TextField()
+    generation = models.IntegerField()
+    row = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'resume_chunks'
+        ordering = ['resume_hash', 'position']
+        verbose_name = 'Resume Chunk'
+        verbose_name_plural = 'Resume Chunks'
+
+    def __str__(self):
+        return f"{self.resume_hash[:12]} #{self.position}"
+
+class ArchivedSession(models.Model):
+    # An inactive session moved out of the live tables by the lifecycle
+    # manager (api/lifecycle.py): the session row and its messages as one
+    # zlib-compressed JSON document.
+    session_id = models.UUIDField(primary_key=True)
+    name = models.CharField(max_length=100)
+    status = models.CharField(max_length=20)
+    message_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField()
+    last_active_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    data = models.BinaryField()
+
+    class Meta:
+        db_table = 'archived_sessions'
+        verbose_name = 'Archived Session'
+        verbose_name_plural = 'Archived Sessions'
+
+    def __str__(self):
+        return f"{self.name} (archived {self.archived_at:%Y-%m-%d})"
+
+    def load(self):
+        """
+        Returns the archived session and its messages as a dict.
+        """
+        return json.loads(zlib.decompress(bytes(self.data)))
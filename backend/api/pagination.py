@@ -0,0 +1,85 @@
+import base64
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import ChatMessage
+
+# Cursor pagination for chat history over the (session, timestamp) index.
+# A cursor names one message by (timestamp, message_id); message_id breaks
+# ties between messages saved in the same instant.
+
+
+def encode_cursor(message):
+    raw = f"{message['timestamp'].isoformat()}|{message['message_id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor):
+    """
+    Returns (timestamp, message_id) for a cursor, or raises ValueError.
+    """
+    try:
+        timestamp, message_id = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8').split('|')
+        parsed = parse_datetime(timestamp)
+        if parsed is None:
+            raise ValueError
+        return parsed, uuid.UUID(message_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def get_page_size(value):
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        return settings.CHAT_HISTORY_PAGE_SIZE
+    return max(1, min(size, settings.CHAT_HISTORY_MAX_PAGE_SIZE))
+
+
+def get_history_page(session_id, after=None, before=None, limit=None):
+    """
+    Returns (messages, has_more) for one page of a session's history, oldest
+    first. With `after`, the page holds the messages following that cursor and
+    has_more says whether newer ones remain. Otherwise it holds the newest
+    messages (preceding `before`, if given) and has_more says whether older
+    ones remain.
+    """
+    limit = get_page_size(limit)
+    messages = ChatMessage.objects.filter(session_id=session_id).values('message_id', 'sender', 'message', 'timestamp')
+
+    if after:
+        timestamp, message_id = decode_cursor(after)
+        page = list(messages.filter(
+            Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, message_id__gt=message_id)
+        ).order_by('timestamp', 'message_id')[:limit + 1])
+        return page[:limit], len(page) > limit
+
+    if before:
+        timestamp, message_id = decode_cursor(before)
+        messages = messages.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, message_id__lt=message_id))
+    page = list(messages.order_by('-timestamp', '-message_id')[:limit + 1])
+    has_more = len(page) > limit
+    return page[:limit][::-1], has_more
+
+
+def get_history_validators(session_id, query_string):
+    """
+    Returns (etag, last_modified) for a history request, derived from the
+    session's newest message. Messages are append-only, so if the newest
+    message hasn't changed, neither has any page of the history.
+    """
+    latest = (
+        ChatMessage.objects.filter(session_id=session_id)
+        .order_by('-timestamp', '-message_id')
+        .values_list('message_id', 'timestamp')
+        .first()
+    )
+    if latest is None:
+        return None, None
+    message_id, timestamp = latest
+    digest = hashlib.sha1(f"{session_id}|{message_id}|{timestamp.isoformat()}|{query_string}".encode('utf-8'))
+    return f'"{digest.hexdigest()}"', timestamp
@@ -0,0 +1,240 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+from django.conf import settings
+from pypdf import PdfReader
+from pypdf.errors import PyPdfError
+
+try:
+    import resource
+except ImportError:  # Windows: no address-space limit for the child.
+    resource = None
+
+# Resume text extraction. Runs once per distinct upload (the result is stored
+# as a ResumeDocument), reads the PDF page by page from the open file rather
+# than loading it into memory, and stops at RESUME_MAX_PAGES pages or
+# RESUME_MAX_TEXT_BYTES bytes of text, whichever comes first. It runs in a
+# child process that is killed after RESUME_EXTRACT_TIMEOUT seconds and may
+# use at most RESUME_EXTRACT_MAX_MEMORY_BYTES of address space, so a single
+# pathological page (a decompression bomb, say) can neither hold the request
+# past the deadline nor exhaust the server's memory.
+
+_SPACES = re.compile(r'[ \t\r\f\v\u00a0]+')
+_BLANK_LINES = re.compile(r'\n\s*\n+')
+
+
+class ResumeUnreadable(Exception):
+    """
+    The file isn't a PDF pypdf can read (corrupt, encrypted, ...). Retrying
+    won't help.
+    """
+
+
+class ResumeExtractionTimeout(Exception):
+    pass
+
+
+def clean_text(text):
+    """
+    Normalizes extracted PDF text: drops NUL bytes, collapses runs of spaces
+    and blank lines.
+    """
+    text = text.replace('\x00', '')
+    text = _SPACES.sub(' ', text)
+    text = _BLANK_LINES.sub('\n', text)
+    return "\n".join(line.strip() for line in text.split('\n')).strip()
+
+
+def _read_pages(file_path, max_pages, max_bytes):
+    parts = []
+    size = 0
+    pages_read = 0
+    truncated = False
+
+    with open(file_path, 'rb') as f:
+        reader = PdfReader(f)
+        page_total = len(reader.pages)
+        for number in range(page_total):
+            if number >= max_pages:
+                truncated = True
+                break
+            page_text = clean_text(reader.pages[number].extract_text() or "")
+            pages_read += 1
+            if not page_text:
+                continue
+            encoded = page_text.encode('utf-8')
+            if size + len(encoded) > max_bytes:
+                # Keep what fits, without splitting a multi-byte character.
+                parts.append(encoded[:max_bytes - size].decode('utf-8', errors='ignore'))
+                truncated = True
+                break
+            parts.append(page_text)
+            size += len(encoded)
+
+    return {'text': "\n".join(parts), 'pages_read': pages_read, 'page_total': page_total, 'truncated': truncated}
+
+
+def _extract_in_child(file_path, max_pages, max_bytes, max_memory):
+    """
+    Entry point of the extraction process (`python -m api.resume_text`).
+    Writes the outcome to stdout as JSON.
+    """
+    if max_memory and resource is not None:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        if hard != resource.RLIM_INFINITY:
+            max_memory = min(max_memory, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (max_memory, hard))
+    try:
+        result = {'outcome': 'ok', **_read_pages(file_path, max_pages, max_bytes)}
+    except PyPdfError as e:
+        result = {'outcome': 'unreadable', 'error': f"{type(e).__name__}: {e}"}
+    except MemoryError:
+        # The allocations that failed are released by now, so there is room
+        # to report it.
+        result = {'outcome': 'error', 'error': f"Ran out of memory ({max_memory} bytes)"}
+    except Exception as e:
+        result = {'outcome': 'error', 'error': f"{type(e).__name__}: {e}"}
+    sys.stdout.write(json.dumps(result))
+
+
+def extract_resume_text(file_path):
+    """
+    Returns (text, pages_read, truncated) for a PDF. Raises ResumeUnreadable
+    for files pypdf rejects, ResumeExtractionTimeout when the deadline passes
+    and RuntimeError for anything else that goes wrong, including running out
+    of memory.
+    """
+    command = [
+        sys.executable, '-m', 'api.resume_text',
+        os.path.abspath(file_path), str(settings.RESUME_MAX_PAGES), str(settings.RESUME_MAX_TEXT_BYTES),
+        str(settings.RESUME_EXTRACT_MAX_MEMORY_BYTES),
+    ]
+    try:
+        completed = subprocess.run(
+            command, cwd=settings.BASE_DIR, capture_output=True,
+            timeout=settings.RESUME_EXTRACT_TIMEOUT, check=False,
+        )
+    except subprocess.TimeoutExpired:
+        # run() has killed the child by now.
+        raise ResumeExtractionTimeout(f"No text after {settings.RESUME_EXTRACT_TIMEOUT:g}s: {file_path}") from None
+    try:
+        result = json.loads(completed.stdout)
+    except ValueError:
+        # Killed by a signal (negative code) or died before reporting, e.g.
+        # when even the error report didn't fit in the memory limit.
+        stderr = completed.stderr.decode('utf-8', errors='replace').strip()
+        raise RuntimeError(f"Resume extraction exited with code {completed.returncode}: {stderr[-500:]}") from None
+
+    if result['outcome'] == 'unreadable':
+        raise ResumeUnreadable(result['error'])
+    if result['outcome'] == 'error':
+        raise RuntimeError(result['error'])
+    if result['truncated']:
+        print(f"Resume text truncated after {result['pages_read']} of {result['page_total']} pages: {file_path}")
+    return result['text'], result['pages_read'], result['truncated']
+
+
+# --- Local Profile Extraction ---
+# Fallback for when the LLM profiling pass is disabled or unavailable: reads
+# the usual resume sections by their headings.
+_SECTION_HEADINGS = {
+    'summary': ('summary', 'profile', 'objective', 'about me', 'career objective', 'professional summary'),
+    'skills': ('skills', 'technical skills', 'key skills', 'core skills', 'core competencies', 'technologies'),
+    'education': ('education', 'academic background', 'academics', 'qualifications', 'educational qualifications'),
+    'experience': ('experience', 'work experience', 'professional experience', 'employment', 'internships',
+                   'internship', 'projects', 'work history'),
+}
+_HEADING_TO_SECTION = {heading: section for section, headings in _SECTION_HEADINGS.items() for heading in headings}
+_BULLET = re.compile(r'^[\-•●▪\*–>]+\s*')
+_SKILL_SEPARATORS = re.compile(r'[,;|•·/]+')
+
+PROFILE_LIST_LIMIT = 12
+PROFILE_ITEM_CHARS = 200
+
+
+def _heading_section(line):
+    heading = line.strip().rstrip(':').strip().lower()
+    return _HEADING_TO_SECTION.get(heading) if len(heading) <= 40 else None
+
+
+def extract_profile_locally(text):
+    """
+    Builds a resume profile (summary, skills, education, experience) from the
+    text's section headings, without an LLM.
+    """
+    sections = {section: [] for section in _SECTION_HEADINGS}
+    preamble = []
+    current = None
+    for line in text.split('\n'):
+        section = _heading_section(line)
+        if section:
+            current = section
+            continue
+        line = _BULLET.sub('', line).strip()
+        if not line:
+            continue
+        (sections[current] if current else preamble).append(line)
+
+    skills = []
+    for line in sections['skills']:
+        # "Languages: Python, Java" -> the part after the label.
+        line = line.split(':', 1)[-1]
+        skills.extend(skill.strip() for skill in _SKILL_SEPARATORS.split(line) if skill.strip())
+
+    summary = " ".join(sections['summary'] or preamble[:3])
+    return normalize_profile({
+        'summary': summary,
+        'skills': list(dict.fromkeys(skills)),
+        'education': sections['education'],
+        'experience': sections['experience'],
+    })
+
+
+def normalize_profile(profile):
+    """
+    Coerces a profile from any source to the stored shape: a summary string
+    and short lists of strings, with lengths capped.
+    """
+    def as_list(value):
+        if isinstance(value, str):
+            value = [value]
+        if not isinstance(value, list):
+            return []
+        items = []
+        for item in value:
+            if isinstance(item, dict):
+                item = ", ".join(str(part) for part in item.values() if part)
+            item = str(item).strip()
+            if item:
+                items.append(item[:PROFILE_ITEM_CHARS])
+        return items[:PROFILE_LIST_LIMIT]
+
+    if not isinstance(profile, dict):
+        profile = {}
+    return {
+        'summary': str(profile.get('summary') or "").strip()[:PROFILE_ITEM_CHARS * 3],
+        'skills': as_list(profile.get('skills')),
+        'education': as_list(profile.get('education')),
+        'experience': as_list(profile.get('experience')),
+    }
+
+
+def format_profile(profile):
+    """
+    Renders a profile as the compact text used in prompts.
+    """
+    lines = []
+    if profile.get('summary'):
+        lines.append(f"Summary: {profile['summary']}")
+    for field, label in (('skills', 'Skills'), ('education', 'Education'), ('experience', 'Experience')):
+        if profile.get(field):
+            separator = ", " if field == 'skills' else "; "
+            lines.append(f"{label}: {separator.join(profile[field])}")
+    return "\n".join(lines)
+
+
+if __name__ == '__main__':
+    _extract_in_child(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))
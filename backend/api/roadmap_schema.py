@@ -0,0 +1,120 @@
+import json
+import re
+
+# The shape of a generated roadmap, per user status, and a tolerant parser
+# for model output. A response is read pathway by pathway: pathways that are
+# complete and valid are kept even when the rest of the response is cut off
+# or malformed, so only the missing ones need to be asked for again.
+
+ROADMAP_PATHWAY_COUNT = 3
+
+# Field -> 'string' or 'list' (of strings).
+SCHOOL_PATHWAY_FIELDS = {
+    'title': 'string',
+    'skills': 'list',
+    'reasoning': 'string',
+}
+CAREER_PATHWAY_FIELDS = {
+    'title': 'string',
+    'skills': 'list',
+    'courses_to_find': 'list',
+    'salary': 'string',
+    'growth': 'string',
+    'reasoning': 'string',
+}
+
+MAX_COURSES_TO_FIND = 3
+
+_PATHWAY_START = re.compile(r'\{\s*"title"')
+_CODE_FENCE = re.compile(r'```(?:json)?\s*(.*?)\s*(?:```|$)', re.DOTALL)
+
+
+def pathway_fields(status):
+    return SCHOOL_PATHWAY_FIELDS if status == 'school_student' else CAREER_PATHWAY_FIELDS
+
+
+def describe_pathway_schema(status):
+    """
+    The pathway fields as a JSON-like outline, for prompts.
+    """
+    outline = {
+        field: "string" if kind == 'string' else ["string", "..."]
+        for field, kind in pathway_fields(status).items()
+    }
+    return json.dumps(outline)
+
+
+def validate_pathway(pathway, status):
+    """
+    Returns the pathway with only the schema's fields, or None if a field is
+    missing or has the wrong type. A comma-separated string is accepted for
+    a list field.
+    """
+    if not isinstance(pathway, dict):
+        return None
+    valid = {}
+    for field, kind in pathway_fields(status).items():
+        value = pathway.get(field)
+        if kind == 'list' and isinstance(value, str):
+            value = [part.strip() for part in value.split(',')]
+        if kind == 'string':
+            if not isinstance(value, (str, int, float)) or not str(value).strip():
+                return None
+            value = str(value).strip()
+        else:
+            if not isinstance(value, list):
+                return None
+            value = [str(item).strip() for item in value if isinstance(item, (str, int, float)) and str(item).strip()]
+            if not value:
+                return None
+        valid[field] = value
+    if 'courses_to_find' in valid:
+        valid['courses_to_find'] = valid['courses_to_find'][:MAX_COURSES_TO_FIND]
+    return valid
+
+
+def salvage_pathways(text):
+    """
+    Reads every complete pathway object out of a model response, whether it
+    is a whole JSON document, fenced in a code block, or truncated partway.
+    """
+    fenced = _CODE_FENCE.search(text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        data = json.loads(text)
+    except ValueError:
+        data = None
+    if isinstance(data, dict) and isinstance(data.get('roadmap'), list):
+        return data['roadmap']
+    if isinstance(data, list):
+        return data
+
+    # Decode each pathway object on its own, skipping any that are broken.
+    decoder = json.JSONDecoder()
+    pathways = []
+    position = 0
+    while True:
+        match = _PATHWAY_START.search(text, position)
+        if not match:
+            return pathways
+        try:
+            pathway, position = decoder.raw_decode(text, match.start())
+            pathways.append(pathway)
+        except ValueError:
+            position = match.start() + 1
+
+
+def valid_pathways(text, status):
+    """
+    The valid pathways in a model response, without duplicate titles, up to
+    ROADMAP_PATHWAY_COUNT.
+    """
+    pathways = []
+    titles = set()
+    for pathway in salvage_pathways(text):
+        pathway = validate_pathway(pathway, status)
+        if pathway and pathway['title'].lower() not in titles:
+            titles.add(pathway['title'].lower())
+            pathways.append(pathway)
+    return pathways[:ROADMAP_PATHWAY_COUNT]
@@ -5,6 +5,13 @@ class UserSessionSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserSession
         fields = '__all__'
+        # Maintained by the server. resume_hash is set by upload_resume only;
+        # a client-chosen hash would point the session at another user's
+        # stored resume.
+        read_only_fields = [
+            'resume_file', 'resume_hash', 'resume_profile', 'roadmap_data',
+            'history_summary', 'summarized_until', 'message_count',
+        ]
         extra_kwargs = {
             'concerns': {'required': False, 'allow_blank': True, 'allow_null': True}
         }
@@ -0,0 +1,177 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ResumeChunk, UserSession
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within a process.
+    fcntl = None
+
+# One vector store for every resume, used when RESUME_INDEX_MODE is 'shared'.
+# Instead of an index directory per resume, all chunk vectors live in a single
+# append-only float32 file that workers memory-map, so the OS page cache holds
+# one copy for all of them. Chunk text and each chunk's row in the file are
+# ResumeChunk rows, tagged with the resume's content hash.
+#
+# A search only ever covers one resume, so it reads that resume's few rows
+# and ranks them exactly; its cost doesn't grow with the number of resumes.
+# Adds append to the file; compact() drops chunks no session references any
+# more by writing a new generation of the file.
+#
+# Layout of the store directory:
+#   lock               flock'd by writers (adds, compaction)
+#   current.json       {"generation": n, "dim": d}
+#   vectors-<n>.f32    row-major float32 vectors for generation n
+
+
+class SharedVectorStore:
+    def __init__(self, root):
+        self.root = root
+        self._maps = {}  # generation -> memmap
+        self._maps_lock = threading.Lock()
+        self._local_lock = threading.Lock()
+
+    # --- Files ---
+    def _vectors_path(self, generation):
+        return os.path.join(self.root, f"vectors-{generation}.f32")
+
+    def _read_current(self):
+        try:
+            with open(os.path.join(self.root, 'current.json')) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'generation': 0, 'dim': None}
+
+    def _write_current(self, current):
+        path = os.path.join(self.root, 'current.json')
+        with open(f"{path}.tmp", 'w') as f:
+            json.dump(current, f)
+        os.replace(f"{path}.tmp", path)
+
+    @contextmanager
+    def _write_lock(self):
+        os.makedirs(self.root, exist_ok=True)
+        with self._local_lock, open(os.path.join(self.root, 'lock'), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _matrix(self, generation, dim, min_rows):
+        """
+        The memory-mapped vectors of a generation, remapped when the file has
+        grown past the rows the caller needs.
+        """
+        with self._maps_lock:
+            matrix = self._maps.get(generation)
+            if matrix is None or matrix.shape[0] < min_rows:
+                matrix = np.memmap(self._vectors_path(generation), dtype=np.float32, mode='r').reshape(-1, dim)
+                self._maps[generation] = matrix
+            return matrix
+
+    # --- Writes ---
+    def has_resume(self, resume_hash):
+        return ResumeChunk.objects.filter(resume_hash=resume_hash).exists()
+
+    def add(self, resume_hash, texts, vectors):
+        """
+        Appends a resume's chunks to the store.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        with self._write_lock():
+            if self.has_resume(resume_hash):
+                return
+            current = self._read_current()
+            if current['dim'] is None:
+                current['dim'] = int(vectors.shape[1])
+                self._write_current(current)
+            path = self._vectors_path(current['generation'])
+            first_row = os.path.getsize(path) // (current['dim'] * 4) if os.path.exists(path) else 0
+            with open(path, 'ab') as f:
+                f.write(vectors.tobytes())
+            # Inside the lock, so compaction never sees rows without chunks.
+            ResumeChunk.objects.bulk_create([
+                ResumeChunk(
+                    resume_hash=resume_hash, position=position, text=text,
+                    generation=current['generation'], row=first_row + position,
+                )
+                for position, text in enumerate(texts)
+            ])
+
+    def compact(self):
+        """
+        Removes chunks of resumes no session uses any more, rewriting the
+        vector file without them. Returns (chunks_kept, chunks_removed).
+        """
+        with self._write_lock():
+            current = self._read_current()
+            if current['dim'] is None:
+                return 0, 0
+            in_use = UserSession.objects.filter(resume_hash__isnull=False).values('resume_hash')
+            # Chunks are added before the uploading session records the
+            # hash, so recent ones are kept regardless.
+            recent = timezone.now() - timedelta(hours=1)
+            stale = ResumeChunk.objects.exclude(resume_hash__in=in_use).filter(created_at__lt=recent)
+            kept = list(ResumeChunk.objects.exclude(pk__in=stale.values('pk')).order_by('generation', 'row'))
+
+            generation = current['generation'] + 1
+            tmp_path = f"{self._vectors_path(generation)}.tmp"
+            with open(tmp_path, 'wb') as f:
+                for old_generation in sorted({chunk.generation for chunk in kept}):
+                    rows = [chunk.row for chunk in kept if chunk.generation == old_generation]
+                    matrix = self._matrix(old_generation, current['dim'], max(rows) + 1)
+                    f.write(np.ascontiguousarray(matrix[rows]).tobytes())
+            os.replace(tmp_path, self._vectors_path(generation))
+
+            for row, chunk in enumerate(kept):
+                chunk.generation = generation
+                chunk.row = row
+            with transaction.atomic():
+                removed, _ = stale.delete()
+                ResumeChunk.objects.bulk_update(kept, ['generation', 'row'], batch_size=500)
+            self._write_current({'generation': generation, 'dim': current['dim']})
+
+            # Workers still reading an old file keep its pages until they
+            # remap; unlinking doesn't pull it out from under them.
+            for name in os.listdir(self.root):
+                if name.startswith('vectors-') and name.endswith('.f32') and name != f"vectors-{generation}.f32":
+                    os.remove(os.path.join(self.root, name))
+            with self._maps_lock:
+                self._maps.clear()
+            return len(kept), removed
+
+    # --- Reads ---
+    def search(self, resume_hash, query_vector, k):
+        """
+        Returns the texts of the `k` chunks of a resume closest to the query
+        vector (L2 distance, as in the per-resume FAISS indexes).
+        """
+        for attempt in range(2):
+            chunks = list(
+                ResumeChunk.objects.filter(resume_hash=resume_hash).values_list('text', 'generation', 'row')
+            )
+            if not chunks:
+                return []
+            dim = len(query_vector)
+            try:
+                vectors = np.stack([
+                    self._matrix(generation, dim, row + 1)[row] for _, generation, row in chunks
+                ])
+                break
+            except FileNotFoundError:
+                # Compacted between reading the rows and opening the file.
+                if attempt:
+                    raise
+        distances = np.linalg.norm(vectors - np.asarray(query_vector, dtype=np.float32), axis=1)
+        return [chunks[i][0] for i in np.argsort(distances)[:k]]
@@ -0,0 +1,71 @@
+import asyncio
+
+from django.test import SimpleTestCase
+
+from api.admission import AdmissionController, Rejected
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def test_admits_up_to_the_limit_then_queues(self):
+        controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=0.01)
+        controller.acquire('a')
+        with self.assertRaises(Rejected) as raised:
+            controller.acquire('b')
+        self.assertEqual(raised.exception.reason, 'queue_timeout')
+        self.assertEqual(controller.queue_depth, 0)
+        self.assertEqual(controller._sessions, {'a'})
+
+    def test_rejects_a_second_turn_for_the_same_session(self):
+        controller = AdmissionController(max_in_flight=2, max_queue=2, queue_timeout=1)
+        controller.acquire('a')
+        with self.assertRaises(Rejected) as raised:
+            controller.acquire('a')
+        self.assertEqual((raised.exception.reason, raised.exception.status), ('session_busy', 429))
+
+    def test_release_hands_the_slot_to_the_next_waiter(self):
+        async def scenario():
+            controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+            await controller.aacquire('a')
+            waiting = asyncio.create_task(controller.aacquire('b'))
+            await asyncio.sleep(0.01)
+            self.assertEqual(controller.queue_depth, 1)
+            controller.release('a')
+            await waiting
+            self.assertEqual(controller.in_flight, 1)
+            self.assertEqual(controller._sessions, {'b'})
+
+        asyncio.run(scenario())
+
+    def test_cancelled_waiter_leaves_the_queue(self):
+        async def scenario():
+            controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+            await controller.aacquire('a')
+            waiting = asyncio.create_task(controller.aacquire('b'))
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            self.assertEqual(controller.queue_depth, 0)
+            self.assertEqual(controller._sessions, {'a'})
+            # The session can queue again, and the slot still works.
+            controller.release('a')
+            self.assertEqual(controller.in_flight, 0)
+            await controller.aacquire('b')
+
+        asyncio.run(scenario())
+
+    def test_cancelled_after_grant_releases_the_slot(self):
+        async def scenario():
+            controller = AdmissionController(max_in_flight=1, max_queue=1, queue_timeout=5)
+            await controller.aacquire('a')
+            waiting = asyncio.create_task(controller.aacquire('b'))
+            await asyncio.sleep(0.01)
+            # Granted, but cancelled before the waiter gets to run.
+            controller.release('a')
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            self.assertEqual(controller.in_flight, 0)
+            self.assertEqual(controller._sessions, set())
+
+        asyncio.run(scenario())
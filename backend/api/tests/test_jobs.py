@@ -0,0 +1,72 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import IntegrityError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from api.jobs import claim_next_job, enqueue_roadmap_job
+from api.models import RoadmapJob, UserSession
+
+
+@override_settings(ROADMAP_JOB_LOCK_TIMEOUT=300)
+class ClaimNextJobTests(TestCase):
+    def _session(self):
+        # A session has at most one active job, so each job gets its own.
+        return UserSession.objects.create(name="Asha", status='passout', age=24)
+
+    def test_claims_the_oldest_due_job_once(self):
+        now = timezone.now()
+        newer = RoadmapJob.objects.create(session=self._session(), run_after=now - timedelta(seconds=1))
+        older = RoadmapJob.objects.create(session=self._session(), run_after=now - timedelta(seconds=10))
+
+        job = claim_next_job('worker-1')
+        self.assertEqual(job.job_id, older.job_id)
+        self.assertEqual((job.status, job.locked_by, job.attempts), ('running', 'worker-1', 1))
+        self.assertEqual(claim_next_job('worker-2').job_id, newer.job_id)
+        self.assertIsNone(claim_next_job('worker-3'))
+
+    def test_skips_jobs_not_yet_due(self):
+        RoadmapJob.objects.create(session=self._session(), run_after=timezone.now() + timedelta(minutes=5))
+        self.assertIsNone(claim_next_job('worker-1'))
+
+    def test_reclaims_jobs_left_running_by_a_dead_worker(self):
+        stale = RoadmapJob.objects.create(
+            session=self._session(), status='running', locked_by='dead', attempts=1,
+            locked_at=timezone.now() - timedelta(seconds=301),
+        )
+        RoadmapJob.objects.create(
+            session=self._session(), status='running', locked_by='alive', attempts=1, locked_at=timezone.now(),
+        )
+
+        job = claim_next_job('worker-1')
+        self.assertEqual(job.job_id, stale.job_id)
+        self.assertEqual((job.locked_by, job.attempts), ('worker-1', 2))
+        self.assertIsNone(claim_next_job('worker-2'))
+
+
+class EnqueueRoadmapJobTests(TransactionTestCase):
+    def setUp(self):
+        self.session = UserSession.objects.create(name="Asha", status='passout', age=24)
+
+    def test_second_enqueue_returns_the_active_job(self):
+        first = enqueue_roadmap_job(self.session)
+        self.assertEqual(enqueue_roadmap_job(self.session).job_id, first.job_id)
+        self.assertEqual(RoadmapJob.objects.filter(session=self.session).count(), 1)
+
+    def test_losing_a_race_returns_the_winners_job(self):
+        # Both turns saw no active job; the second insert hits the constraint.
+        winner = RoadmapJob.objects.create(session=self.session)
+        no_job = RoadmapJob.objects.none()
+        with mock.patch.object(RoadmapJob.objects, 'filter', side_effect=[no_job, RoadmapJob.objects.filter(pk=winner.pk)]):
+            job = enqueue_roadmap_job(self.session)
+        self.assertEqual(job.job_id, winner.job_id)
+        self.assertEqual(RoadmapJob.objects.filter(session=self.session).count(), 1)
+
+    def test_constraint_rejects_a_second_active_job(self):
+        RoadmapJob.objects.create(session=self.session)
+        with self.assertRaises(IntegrityError):
+            RoadmapJob.objects.create(session=self.session, status='running')
+        # Finished jobs don't count.
+        RoadmapJob.objects.filter(session=self.session).update(status='ready')
+        RoadmapJob.objects.create(session=self.session)
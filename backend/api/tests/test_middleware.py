@@ -0,0 +1,20 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from api.admission import AdmissionController
+
+
+class AdmissionControlMiddlewareTests(TestCase):
+    def test_shed_response_is_readable_cross_origin(self):
+        # No slots and no queue: every LLM-bound request is turned away.
+        full = AdmissionController(max_in_flight=0, max_queue=0, queue_timeout=0)
+        with mock.patch('api.middleware.get_admission_controller', return_value=full):
+            response = self.client.post(
+                '/api/submit_questionnaire/', {}, content_type='application/json',
+                HTTP_ORIGIN='http://localhost:3000',
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Access-Control-Allow-Origin'], 'http://localhost:3000')
+        self.assertIn('retry-after', response['Access-Control-Expose-Headers'].lower())
+        self.assertIn('Retry-After', response)
@@ -0,0 +1,51 @@
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.models import ChatMessage, UserSession
+from api.pagination import decode_cursor, encode_cursor, get_history_page
+
+
+@override_settings(CHAT_HISTORY_PAGE_SIZE=2, CHAT_HISTORY_MAX_PAGE_SIZE=3)
+class HistoryPaginationTests(TestCase):
+    def setUp(self):
+        self.session = UserSession.objects.create(name="Asha", status='passout', age=24)
+        self.session.add_messages(*[('user', f"m{i}") for i in range(5)])
+        # Several messages saved in the same instant; the cursor must still
+        # page through them without skipping or repeating any.
+        ChatMessage.objects.filter(session=self.session).update(timestamp=timezone.now())
+
+    def _texts(self, page):
+        return [message['message'] for message in page]
+
+    def _all_in_order(self):
+        return self._texts(ChatMessage.objects.filter(session=self.session).order_by('timestamp', 'message_id').values())
+
+    def test_cursor_round_trip(self):
+        message = ChatMessage.objects.filter(session=self.session).values('message_id', 'timestamp').first()
+        self.assertEqual(decode_cursor(encode_cursor(message)), (message['timestamp'], message['message_id']))
+
+    def test_invalid_cursor_raises_value_error(self):
+        for cursor in ('', 'not-base64!', 'Zm9v'):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_pages_backwards_then_forwards(self):
+        page, has_more = get_history_page(self.session.session_id)
+        pages = [page]
+        while has_more:
+            page, has_more = get_history_page(self.session.session_id, before=encode_cursor(page[0]))
+            pages.insert(0, page)
+        self.assertEqual([message for page in pages for message in self._texts(page)], self._all_in_order())
+
+        # Polling forwards from the oldest message returns the rest.
+        page, has_more = get_history_page(self.session.session_id, after=encode_cursor(pages[0][0]), limit=3)
+        self.assertEqual(self._texts(page), self._all_in_order()[1:4])
+        self.assertTrue(has_more)
+        page, has_more = get_history_page(self.session.session_id, after=encode_cursor(page[-1]), limit=3)
+        self.assertEqual(self._texts(page), self._all_in_order()[4:])
+        self.assertFalse(has_more)
+
+    def test_limit_is_clamped(self):
+        page, has_more = get_history_page(self.session.session_id, limit=100)
+        self.assertEqual(len(page), 3)
+        self.assertTrue(has_more)
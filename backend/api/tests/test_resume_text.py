@@ -0,0 +1,82 @@
+import os
+import sys
+import tempfile
+import zlib
+from unittest import mock, skipIf
+
+from django.test import TestCase, override_settings
+from pypdf import PdfWriter
+from pypdf.generic import NameObject, StreamObject
+
+from api.llm_engine import get_resume_document
+from api.models import ResumeDocument
+from api.resume_text import ResumeExtractionTimeout, ResumeUnreadable, extract_resume_text
+
+
+class ResumeExtractionTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    def _blank_pdf(self):
+        path = os.path.join(self.tmp.name, 'blank.pdf')
+        writer = PdfWriter()
+        writer.add_blank_page(width=612, height=792)
+        with open(path, 'wb') as f:
+            writer.write(f)
+        return path
+
+    def _bomb_pdf(self):
+        # One page whose content stream inflates from ~70 KB to ~70 MB.
+        compressor = zlib.compressobj(9)
+        data = compressor.compress(b"BT (")
+        chunk = b"A" * 1_000_000
+        for _ in range(70):
+            data += compressor.compress(chunk)
+        data += compressor.compress(b") Tj ET") + compressor.flush()
+
+        writer = PdfWriter()
+        page = writer.add_blank_page(width=612, height=792)
+        contents = StreamObject()
+        contents._data = data
+        contents[NameObject('/Filter')] = NameObject('/FlateDecode')
+        page[NameObject('/Contents')] = writer._add_object(contents)
+        path = os.path.join(self.tmp.name, 'bomb.pdf')
+        with open(path, 'wb') as f:
+            writer.write(f)
+        return path
+
+    def test_extracts_a_pdf_in_a_child_process(self):
+        self.assertEqual(extract_resume_text(self._blank_pdf()), ("", 1, False))
+
+    def test_broken_pdf_is_unreadable(self):
+        with self.assertRaises(ResumeUnreadable):
+            extract_resume_text(self._write('broken.pdf', b'%PDF-1.4 ' + b'x' * 200))
+
+    def test_unreadable_resume_is_stored_empty(self):
+        document = get_resume_document(self._write('broken.pdf', b'%PDF-1.4 ' + b'x' * 200), 'a' * 64)
+        self.assertEqual(document.text, "")
+        self.assertTrue(ResumeDocument.objects.filter(content_hash='a' * 64).exists())
+
+    def test_timeout_is_not_stored(self):
+        with mock.patch('api.llm_engine.extract_resume_text', side_effect=ResumeExtractionTimeout("slow")):
+            self.assertIsNone(get_resume_document(self._blank_pdf(), 'b' * 64))
+        self.assertFalse(ResumeDocument.objects.filter(content_hash='b' * 64).exists())
+
+        # The next attempt extracts it.
+        self.assertEqual(get_resume_document(self._blank_pdf(), 'b' * 64).page_count, 1)
+
+    @skipIf(sys.platform == 'win32', "No address-space limit on Windows.")
+    @override_settings(RESUME_EXTRACT_MAX_MEMORY_BYTES=64 * 1024 * 1024)
+    def test_out_of_memory_is_not_stored(self):
+        bomb = self._bomb_pdf()
+        with self.assertRaises(RuntimeError):
+            extract_resume_text(bomb)
+        self.assertIsNone(get_resume_document(bomb, 'c' * 64))
+        self.assertFalse(ResumeDocument.objects.filter(content_hash='c' * 64).exists())
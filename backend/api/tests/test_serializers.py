@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from api.serializers import UserSessionSerializer
+
+
+class UserSessionSerializerTests(TestCase):
+    def test_server_maintained_fields_are_ignored(self):
+        serializer = UserSessionSerializer(data={
+            'name': "Asha",
+            'status': 'passout',
+            'age': 24,
+            'resume_hash': 'a' * 64,
+            'resume_file': 'resumes/someone-else.pdf',
+            'resume_profile': {'skills': ['Injected']},
+            'roadmap_data': {'roadmap': []},
+            'history_summary': "Injected summary",
+            'summarized_until': '2024-01-01T00:00:00Z',
+            'message_count': 99,
+        })
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        session = serializer.save()
+
+        self.assertIsNone(session.resume_hash)
+        self.assertFalse(session.resume_file)
+        self.assertIsNone(session.resume_profile)
+        self.assertIsNone(session.roadmap_data)
+        self.assertIsNone(session.history_summary)
+        self.assertIsNone(session.summarized_until)
+        self.assertEqual(session.message_count, 0)
@@ -0,0 +1,34 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from api.models import ChatMessage, UserSession
+
+
+class SendMessageStreamTests(TestCase):
+    def setUp(self):
+        self.session = UserSession.objects.create(name="Asha", status='passout', age=24)
+
+    def _stream(self, tokens):
+        with mock.patch('api.views.stream_chat_with_ai', return_value=iter(tokens)):
+            response = self.client.post(
+                '/api/send_message/stream/',
+                {'session_id': str(self.session.session_id), 'message': "What should I study?"},
+                content_type='application/json',
+            )
+            return b"".join(response.streaming_content).decode()
+
+    def test_saves_the_turn(self):
+        body = self._stream(["Try ", "statistics."])
+        self.assertIn("event: done", body)
+        self.assertEqual(
+            list(ChatMessage.objects.filter(session=self.session).order_by('timestamp').values_list('sender', 'message')),
+            [('user', "What should I study?"), ('ai', "Try statistics.")],
+        )
+        self.session.refresh_from_db()
+        self.assertEqual(self.session.message_count, 2)
+
+    def test_saves_nothing_without_a_reply(self):
+        body = self._stream([])
+        self.assertIn("event: error", body)
+        self.assertFalse(ChatMessage.objects.filter(session=self.session).exists())
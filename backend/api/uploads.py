@@ -0,0 +1,87 @@
+import hashlib
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+
+# Resume uploads are streamed to a temporary file in chunks and hashed as
+# they arrive, then stored once under their content hash
+# (resumes/<sha256>.pdf). Sessions that upload the same document share the
+# stored file, and everything derived from it (text, index, profile) is
+# keyed by the same hash. Files that go over RESUME_MAX_UPLOAD_BYTES or
+# don't start like a PDF are dropped while they are being received.
+
+RESUME_FIELD = 'resume'
+RESUME_UPLOAD_DIR = 'resumes'
+
+# A PDF's header must appear within its first 1024 bytes.
+PDF_HEADER = b'%PDF-'
+PDF_HEADER_WINDOW = 1024
+
+
+class ResumeUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams the resume file to disk while computing its SHA-256. A rejected
+    file is skipped and the reason left in `rejection` ('too_large' or
+    'not_pdf') for the view to report.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.rejection = None
+
+    def new_file(self, field_name, *args, **kwargs):
+        if field_name != RESUME_FIELD:
+            raise SkipFile()
+        super().new_file(field_name, *args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.received = 0
+        self.head = b''
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.RESUME_MAX_UPLOAD_BYTES:
+            self.rejection = 'too_large'
+            self._reject()
+        if len(self.head) < PDF_HEADER_WINDOW:
+            self.head += raw_data[:PDF_HEADER_WINDOW - len(self.head)]
+            if len(self.head) >= PDF_HEADER_WINDOW and PDF_HEADER not in self.head:
+                self.rejection = 'not_pdf'
+                self._reject()
+        self.digest.update(raw_data)
+        super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        if PDF_HEADER not in self.head:
+            # Shorter than the header window; SkipFile can't be raised here,
+            # so the file is just left out of request.FILES.
+            self.rejection = 'not_pdf'
+            self.upload_interrupted()
+            return None
+        uploaded = super().file_complete(file_size)
+        uploaded.content_hash = self.digest.hexdigest()
+        return uploaded
+
+    def _reject(self):
+        self.upload_interrupted()
+        raise SkipFile()
+
+
+def resume_blob_name(content_hash):
+    return f"{RESUME_UPLOAD_DIR}/{content_hash}.pdf"
+
+
+def store_resume_blob(uploaded):
+    """
+    Stores an uploaded resume under its content hash, unless a file with the
+    same content is already stored. Returns the storage name.
+    """
+    name = resume_blob_name(uploaded.content_hash)
+    if default_storage.exists(name):
+        return name
+    saved_name = default_storage.save(name, uploaded)
+    if saved_name != name:
+        # A concurrent upload of the same file stored it first; the storage
+        # gave ours a new name. Both copies are identical.
+        default_storage.delete(saved_name)
+    return name
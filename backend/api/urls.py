@@ -1,11 +1,16 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the LLM-bound endpoints are served by their async versions.
+llm_views = async_views if settings.USE_ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('submit_questionnaire/', views.submit_questionnaire, name='submit_questionnaire'),
-    path('send_message/', views.send_message, name='send_message'),
+    path('submit_questionnaire/', llm_views.submit_questionnaire, name='submit_questionnaire'),
+    path('send_message/', llm_views.send_message, name='send_message'),
+    path('send_message/stream/', views.send_message_stream, name='send_message_stream'),
     path('get_chat_history/<uuid:session_id>/', views.get_chat_history, name='get_chat_history'),
     path('resume/upload/', views.upload_resume, name='upload_resume'),
-    path('roadmap/<uuid:session_id>/', views.get_roadmap, name='get_roadmap'),
+    path('roadmap/<uuid:session_id>/', llm_views.get_roadmap, name='get_roadmap'),
 ]
 
@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict
+
+
+def estimate_vector_store_bytes(vector_store):
+    """
+    Rough resident size of a FAISS vector store: float32 vectors plus the
+    stored chunk text. Good enough for budgeting, not exact accounting.
+    """
+    index = vector_store.index
+    size = index.ntotal * index.d * 4
+    for doc in getattr(vector_store.docstore, '_dict', {}).values():
+        size += len(doc.page_content.encode('utf-8'))
+    return size
+
+
+class VectorStoreCache:
+    """
+    Thread-safe LRU cache of loaded vector stores, bounded by an estimated
+    byte budget rather than an entry count.
+    """
+
+    def __init__(self, max_bytes, sizeof=estimate_vector_store_bytes):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (vector_store, size)
+        self._lock = threading.Lock()
+        self.resident_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, vector_store):
+        size = self.sizeof(vector_store)
+        with self._lock:
+            if key in self._entries:
+                self.resident_bytes -= self._entries.pop(key)[1]
+            # An entry bigger than the whole budget is served but not kept.
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (vector_store, size)
+            self.resident_bytes += size
+            while self.resident_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.resident_bytes -= evicted_size
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached store for `key`, calling `loader()` on a miss.
+        Loading happens outside the lock so a slow load doesn't block hits.
+        """
+        vector_store = self.get(key)
+        if vector_store is None:
+            vector_store = loader()
+            if vector_store is not None:
+                self.put(key, vector_store)
+        return vector_store
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.resident_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'resident_bytes': self.resident_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
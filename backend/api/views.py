@@ -1,9 +1,22 @@
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from .models import UserSession, ChatMessage
-from .serializers import UserSessionSerializer, ChatMessageSerializer, ChatSendSerializer, ChatHistorySerializer
-from .llm_engine import chat_with_ai, generate_career_roadmap
+from .models import UserSession
+from .serializers import UserSessionSerializer, ChatMessageSerializer, ChatSendSerializer
+from .history import build_chat_history
+from .pagination import encode_cursor, get_history_page, get_history_validators
+from .jobs import ROADMAP_READY_MESSAGE, enqueue_roadmap_job, get_latest_job, roadmap_due
+from .llm_engine import chat_with_ai, stream_chat_with_ai, build_resume_index, generate_welcome_message, get_resume_profile
+from .metrics import span
+from .db_router import reads_from_replica
+from .uploads import ResumeUploadHandler, store_resume_blob
+from .groq_client import LLMUnavailable
 
 
 @api_view(['POST'])
@@ -14,10 +27,11 @@ def submit_questionnaire(request):
         
         # --- NEW: Generate a dynamic welcome message using the LLM ---
         context = { "name": session.name, "status": session.status, "age": session.age }
-        # The initial message is a placeholder to trigger the "Phase 1" welcome logic in the LLM.
-        welcome_message = chat_with_ai(context, "The user has just completed the questionnaire and joined the chat.", "")
+        # Cached per status and age, so a burst of sign-ups costs one LLM call.
+        welcome_message = generate_welcome_message(context)
         
-        ChatMessage.objects.create(session=session, sender='ai', message=welcome_message)
+        with span('db_save'):
+            session.add_messages(('ai', welcome_message))
         
         return Response({
             'success': True,
@@ -26,6 +40,19 @@ def submit_questionnaire(request):
     
     return Response({'success': False, 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
+def _create_roadmap_reply(session, message_text):
+    """
+    Queues roadmap generation for the session, then saves the user's message
+    with the AI message pointing them to the roadmap page and returns the latter.
+    """
+    with transaction.atomic():
+        enqueue_roadmap_job(session)
+        _, ai_message = session.add_messages(
+            ('user', message_text),
+            ('ai', ROADMAP_READY_MESSAGE.format(session_id=session.session_id)),
+        )
+    return ai_message
+
 @api_view(['POST'])
 def send_message(request):
     serializer = ChatSendSerializer(data=request.data)
@@ -36,49 +63,29 @@ def send_message(request):
     message_text = serializer.validated_data['message']
     
     try:
-        session = UserSession.objects.get(session_id=session_id)
-        
-        # Save the user's message
-        ChatMessage.objects.create(session=session, sender='user', message=message_text)
-
-
-         # 1. Check if the user is explicitly asking for the roadmap
-        user_wants_roadmap = 'roadmap' in message_text.lower() or 'career plan' in message_text.lower()
-
-         # --- ROADMAP TRIGGER LOGIC ---
-         # First, get the total message count for this session
-        message_count = ChatMessage.objects.filter(session=session).count()
-        limit_reached = message_count >= 20
-        # Check if the message limit is reached AND the roadmap hasn't been created yet
-        if (limit_reached or user_wants_roadmap) and not session.roadmap_data:
-            
-            # This part of the logic is unchanged. It generates and saves the roadmap.
-            history_queryset = ChatMessage.objects.filter(session=session).order_by("timestamp")
-            history_text = "\n".join([f"{msg.get_sender_display()}: {msg.message}" for msg in history_queryset])
-            
-            roadmap_json = generate_career_roadmap(session, history_text)
-            session.roadmap_data = roadmap_json
-            session.save()
-            
-            final_ai_message_text = f"Oops! You've reached the message limit for this session. We've had a great conversation! I've prepared a personalized career roadmap for you based on everything we've discussed. You can access it here: [View Your Roadmap](/roadmap/{session.session_id})"
-            
-            ai_message = ChatMessage.objects.create(session=session, sender='ai', message=final_ai_message_text)
+        with span('db_session'):
+            session = UserSession.objects.get(session_id=session_id)
+
+        # --- ROADMAP TRIGGER LOGIC ---
+        if roadmap_due(session, message_text):
+            ai_message = _create_roadmap_reply(session, message_text)
         else:
             # --- NORMAL CONVERSATION FLOW ---
             # If the limit isn't reached, continue the conversation as usual.
         
-            # Get the full conversation history to provide context to the LLM
-            history_queryset = ChatMessage.objects.filter(session=session).order_by("timestamp")
-            history_text = "\n".join([f"{msg.get_sender_display()}: {msg.message}" for msg in history_queryset])
+            # Get the conversation history (summary plus recent turns) to provide context to the LLM
+            with span('history'):
+                history_text = build_chat_history(session)
         
             # Prepare the context from the user's session data
-            context = { "name": session.name, "status": session.status, "age": session.age }
+            context = { "name": session.name, "status": session.status, "age": session.age, "resume_hash": session.resume_hash, "resume_profile": session.resume_profile }
         
             # Call the LLM to get the next response
             ai_response_text = chat_with_ai(context, message_text, history_text)
         
-            # Save the AI's response
-            ai_message = ChatMessage.objects.create(session=session, sender='ai', message=ai_response_text)
+            # Save the user's message and the AI's response together
+            with span('db_save'):
+                _, ai_message = session.add_messages(('user', message_text), ('ai', ai_response_text))
         
         return Response({
             'success': True,
@@ -87,40 +94,210 @@ def send_message(request):
     
     except UserSession.DoesNotExist:
         return Response({'success': False, 'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+    except LLMUnavailable as e:
+        return _llm_unavailable_response(e)
+
+
+def _llm_unavailable_response(error):
+    """
+    503 telling the client when to retry, for when Groq is saturated.
+    """
+    response = Response(
+        {'success': False, 'error': 'The counselor is busy right now. Please try again shortly.'},
+        status=status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+    response['Retry-After'] = str(max(1, round(error.retry_after or 1)))
+    return response
+
+@api_view(['POST'])
+def send_message_stream(request):
+    """
+    Streaming variant of send_message. Replies with Server-Sent Events: one
+    `token` event per piece of text as Groq generates it, then a `done` event
+    carrying the saved AI message.
+    """
+    serializer = ChatSendSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({'success': False, 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+
+    session_id = serializer.validated_data['session_id']
+    message_text = serializer.validated_data['message']
 
-@api_view(['GET'])
-def get_chat_history(request, session_id):
     try:
-        session = UserSession.objects.get(session_id=session_id)
-        serializer = ChatHistorySerializer(session)
-        return Response(serializer.data, status=status.HTTP_200_OK)
-    
+        with span('db_session'):
+            session = UserSession.objects.get(session_id=session_id)
     except UserSession.DoesNotExist:
         return Response({'success': False, 'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    if roadmap_due(session, message_text):
+        # The roadmap reply isn't generated token by token, so it is sent as a
+        # single `done` event.
+        ai_message = _create_roadmap_reply(session, message_text)
+        done_event = _sse_event('done', {'success': True, 'ai_response': ChatMessageSerializer(ai_message).data})
+        return StreamingHttpResponse(
+            iter([done_event]),
+            content_type='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+        )
+
+    with span('history'):
+        history_text = build_chat_history(session)
+    context = { "name": session.name, "status": session.status, "age": session.age, "resume_hash": session.resume_hash, "resume_profile": session.resume_profile }
+
+    def event_stream():
+        parts = []
+        try:
+            for token in stream_chat_with_ai(context, message_text, history_text):
+                parts.append(token)
+                yield _sse_event('token', {'text': token})
+        except Exception as e:
+            print(f"Error streaming chat response: {e}")
+        finally:
+            # Persist whatever was generated, even if the client went away
+            # before the stream finished. A turn with no reply isn't saved, so
+            # the history never holds a question without its answer.
+            ai_message = None
+            if parts:
+                _, ai_message = session.add_messages(('user', message_text), ('ai', "".join(parts)))
+        if ai_message:
+            yield _sse_event('done', {'success': True, 'ai_response': ChatMessageSerializer(ai_message).data})
+        else:
+            yield _sse_event('error', {'success': False, 'error': 'The AI did not return a response.'})
+
+    return StreamingHttpResponse(
+        event_stream(),
+        content_type='text/event-stream',
+        # Stop proxies from buffering the stream and delaying the first token.
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@api_view(['GET'])
+@reads_from_replica
+def get_chat_history(request, session_id):
+    """
+    Returns a page of a session's chat history, oldest message first.
+
+    By default the page holds the newest messages. `?before=<cursor>` pages
+    back through older ones and `?after=<cursor>` fetches only messages newer
+    than the cursor, for polling. `?limit=` sets the page size. Responses carry
+    ETag and Last-Modified validators, so a repeated poll with nothing new
+    gets a 304 without the history being read or serialized.
+    """
+    with span('db_validators'):
+        etag, last_modified = get_history_validators(session_id, request.META.get('QUERY_STRING', ''))
+    if etag and _not_modified(request, etag, last_modified):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        _set_validators(response, etag, last_modified)
+        return response
+
+    session = UserSession.objects.filter(session_id=session_id).values('session_id', 'name', 'status').first()
+    if session is None:
+        return Response({'success': False, 'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    after = request.query_params.get('after')
+    try:
+        with span('db_history_page'):
+            messages, has_more = get_history_page(
+                session_id,
+                after=after,
+                before=request.query_params.get('before'),
+                limit=request.query_params.get('limit'),
+            )
+    except ValueError as e:
+        return Response({'success': False, 'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    response = Response({
+        **session,
+        'messages': ChatMessageSerializer(messages, many=True).data,
+        'has_more': has_more,
+        # Cursors for the messages before and after this page. With an empty
+        # page, the `after` cursor stays where the client was.
+        'before_cursor': encode_cursor(messages[0]) if messages else None,
+        'after_cursor': encode_cursor(messages[-1]) if messages else after,
+    }, status=status.HTTP_200_OK)
+    if etag:
+        _set_validators(response, etag, last_modified)
+    return response
+
+
+def _not_modified(request, etag, last_modified):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        # ETags take precedence over dates when both are sent.
+        return if_none_match.strip() == '*' or etag in parse_etags(if_none_match)
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE'))
+    return if_modified_since is not None and int(last_modified.timestamp()) <= if_modified_since
+
+
+def _set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Clients must revalidate, but may keep the copy they have.
+    response['Cache-Control'] = 'no-cache'
     
 @api_view(['GET'])
+@reads_from_replica
 def get_roadmap(request, session_id):
     """
-    Get the generated career roadmap for a session
+    Get the generated career roadmap for a session. While the roadmap is still
+    being generated this returns 202 with its job status and a Retry-After.
+    `?wait=` is ignored here: holding the request open would tie up a worker
+    thread, so long-polling is only done by async_views.get_roadmap.
     """
     try:
         session = UserSession.objects.get(session_id=session_id)
-        if session.roadmap_data:
-            return Response(session.roadmap_data, status=status.HTTP_200_OK)
-        else:
-            return Response({'error': 'Roadmap not generated yet.'}, status=status.HTTP_404_NOT_FOUND)
-    
     except UserSession.DoesNotExist:
         return Response({'error': 'Session not found'}, status=status.HTTP_404_NOT_FOUND)
 
+    if session.roadmap_data:
+        return Response(session.roadmap_data, status=status.HTTP_200_OK)
+    job = get_latest_job(session)
+    if job is None:
+        return Response({'error': 'Roadmap not generated yet.'}, status=status.HTTP_404_NOT_FOUND)
+    if job.status == 'failed':
+        return Response({'status': 'failed', 'error': 'Roadmap generation failed.'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    response = Response({'status': 'pending'}, status=status.HTTP_202_ACCEPTED)
+    response['Retry-After'] = str(max(1, round(settings.ROADMAP_POLL_INTERVAL)))
+    return response
+
+# Room for the multipart boundaries and the session_id field around the file.
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+def _resume_too_large_response():
+    return Response(
+        {'success': False, 'error': f'Resume files must be under {settings.RESUME_MAX_UPLOAD_BYTES / (1024 * 1024):g} MB.'},
+        status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    )
+
 @api_view(['POST'])
 def upload_resume(request):
     """
     Handles resume file uploads for a given session.
     """
+    # Refuse bodies that can't hold an acceptable file before reading them.
+    content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if content_length > settings.RESUME_MAX_UPLOAD_BYTES + UPLOAD_FORM_OVERHEAD_BYTES:
+        return _resume_too_large_response()
+
+    # Stream the file to disk, hashing it on the way (see uploads.py).
+    upload_handler = ResumeUploadHandler(request._request)
+    request.upload_handlers = [upload_handler]
     session_id = request.data.get('session_id')
     resume_file = request.FILES.get('resume')
 
+    if upload_handler.rejection == 'too_large':
+        return _resume_too_large_response()
+    if upload_handler.rejection == 'not_pdf':
+        return Response(
+            {'success': False, 'error': 'Resumes must be PDF files.'},
+            status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+        )
+
     # Validation to ensure the required data is present
     if not session_id or not resume_file:
         return Response(
@@ -136,9 +313,20 @@ def upload_resume(request):
             status=status.HTTP_404_NOT_FOUND
         )
 
-    # Assign the uploaded file to the model field and save the session
-    session.resume_file = resume_file
-    session.save()
+    # Store the file under its content hash; a document uploaded before is
+    # not stored again.
+    with span('file_save'):
+        session.resume_file.name = store_resume_blob(resume_file)
+        session.save(update_fields=['resume_file', 'updated_at'])
+
+    # Build the resume's vector index once, here, so chat turns only load it.
+    with span('resume_index'):
+        session.resume_hash = build_resume_index(session.resume_file.path, resume_file.content_hash)
+    # Profile it once too, so chat turns can use the profile instead of
+    # searching the index every time.
+    with span('resume_profile'):
+        session.resume_profile = get_resume_profile(session.resume_file.path, session.resume_hash)
+    session.save(update_fields=['resume_hash', 'resume_profile'])
 
     # --- LLM Trigger (Optional) ---
     # You could immediately trigger the LLM to analyze the resume and send a new message.
@@ -147,11 +335,7 @@ def upload_resume(request):
     # Create a confirmation message to add to the chat history
     ai_message_text = f"Thank you for uploading your resume, '{resume_file.name}'. I will review it now. What specific roles are you interested in?"
     
-    ai_message = ChatMessage.objects.create(
-        session=session,
-        sender='ai',
-        message=ai_message_text
-    )
+    ai_message, = session.add_messages(('ai', ai_message_text))
     
     return Response({
         'success': True,
@@ -1,40 +1,209 @@
 # In backend/api/youtube.py
 
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import httplib2
 from googleapiclient.discovery import build
 from django.conf import settings
+from django.utils import timezone
 
-def get_youtube_courses(skill, max_results=1):
+from .models import YouTubeCourseCache
+from .metrics import span, record_cache_lookup
+
+YOUTUBE_API_SERVICE_NAME = "youtube"
+YOUTUBE_API_VERSION = "v3"
+
+# Building the service object parses the discovery document, so it is done
+# once per process. The service is safe to share, but its httplib2
+# connection is not, so each thread executes requests over its own Http.
+_youtube = None
+_youtube_lock = threading.Lock()
+_thread_local = threading.local()
+_lookup_pool = None
+
+
+def get_youtube_client():
     """
-    Search YouTube for a course/tutorial about a specific skill.
+    Returns the process-wide YouTube Data API service object.
+    """
+    global _youtube
+    if _youtube is None:
+        with _youtube_lock:
+            if _youtube is None:
+                # Assumes you have YOUTUBE_API_KEY in your settings.py file
+                client_options = None
+                if settings.YOUTUBE_API_ENDPOINT:
+                    client_options = {'api_endpoint': settings.YOUTUBE_API_ENDPOINT}
+                _youtube = build(
+                    YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION,
+                    developerKey=settings.YOUTUBE_API_KEY, cache_discovery=False,
+                    client_options=client_options
+                )
+    return _youtube
+
+
+def _get_thread_http():
+    http = getattr(_thread_local, 'http', None)
+    if http is None:
+        http = httplib2.Http(timeout=settings.YOUTUBE_REQUEST_TIMEOUT)
+        _thread_local.http = http
+    return http
+
+
+# --- Course Result Cache ---
+# Lookups are cached by normalized skill text and max_results in two tiers: a
+# small in-process dict in front of a table shared by all workers, which
+# survives restarts. Empty results are cached for a shorter time; failed
+# lookups (quota, network) are not cached at all.
+_memory_cache = OrderedDict()  # cache_key -> (results, expires_at timestamp)
+_memory_cache_lock = threading.Lock()
+
+
+def _normalize_skill(skill):
+    return " ".join(str(skill).lower().split())
+
+
+def _cache_key(skill, max_results):
+    return hashlib.sha256(f"{max_results}:{_normalize_skill(skill)}".encode('utf-8')).hexdigest()
+
+
+def _remember(key, results, expires_at):
+    with _memory_cache_lock:
+        _memory_cache[key] = (results, expires_at)
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > settings.YOUTUBE_CACHE_MEMORY_ENTRIES:
+            _memory_cache.popitem(last=False)
+
+
+def get_cached_courses(skill, max_results):
+    """
+    Returns cached results for a lookup, or None on a miss.
+    """
+    key = _cache_key(skill, max_results)
+    now = time.time()
+    with _memory_cache_lock:
+        entry = _memory_cache.get(key)
+        if entry and entry[1] > now:
+            _memory_cache.move_to_end(key)
+            record_cache_lookup('youtube', 'memory_hit')
+            return entry[0]
+
+    cached = YouTubeCourseCache.objects.filter(cache_key=key, expires_at__gt=timezone.now()).first()
+    if cached is None:
+        record_cache_lookup('youtube', 'miss')
+        return None
+    record_cache_lookup('youtube', 'db_hit')
+    _remember(key, cached.results, cached.expires_at.timestamp())
+    return cached.results
+
+
+def cache_courses(skill, max_results, results):
+    key = _cache_key(skill, max_results)
+    ttl = settings.YOUTUBE_CACHE_TTL if results else settings.YOUTUBE_CACHE_NEGATIVE_TTL
+    expires_at = timezone.now() + timedelta(seconds=ttl)
+    _remember(key, results, expires_at.timestamp())
+    YouTubeCourseCache.objects.update_or_create(
+        cache_key=key,
+        defaults={
+            'skill': _normalize_skill(skill)[:255],
+            'max_results': max_results,
+            'results': results,
+            'expires_at': expires_at,
+        },
+    )
+
+
+# --- Lookups ---
+def _search_youtube(skill, max_results):
+    """
+    Calls the YouTube search API. Returns the results, or None if the call
+    failed.
     """
-    # Assumes you have YOUTUBE_API_KEY in your settings.py file
-    API_KEY = settings.YOUTUBE_API_KEY
-    YOUTUBE_API_SERVICE_NAME = "youtube"
-    YOUTUBE_API_VERSION = "v3"
-    
     try:
-        youtube = build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, developerKey=API_KEY)
-        
-        request = youtube.search().list(
+        request = get_youtube_client().search().list(
             q=f"{skill} course tutorial for beginners",
             part="snippet",
             type="video",
             maxResults=max_results,
             videoCategoryId="27" # Category ID for "Education"
         )
-        response = request.execute()
-        
-        results = []
-        for item in response.get('items', []):
-            video_id = item.get('id', {}).get('videoId')
-            snippet = item.get('snippet', {})
-            if video_id and snippet:
-                results.append({
-                    "name": snippet.get('title', 'Untitled Video'),
-                    "url": f"https://www.youtube.com/watch?v={video_id}"
-                })
-        return results
+        with span('youtube_search'):
+            response = request.execute(http=_get_thread_http())
+        return _parse_search_response(response)
         
     except Exception as e:
         print(f"Failed to fetch YouTube courses for '{skill}': {str(e)}")
-        return []
\ No newline at end of file
+        return None
+
+
+def get_youtube_courses(skill, max_results=1):
+    """
+    Search YouTube for a course/tutorial about a specific skill.
+    """
+    cached = get_cached_courses(skill, max_results)
+    if cached is not None:
+        return cached
+
+    results = _search_youtube(skill, max_results)
+    if results is None:
+        return []
+    cache_courses(skill, max_results, results)
+    return results
+
+
+def get_youtube_courses_bulk(skills, max_results=1):
+    """
+    Looks up courses for many skills at once. Cache misses are searched on a
+    bounded, process-wide thread pool. Returns a dict mapping each skill to
+    its results; searches that don't finish within YOUTUBE_BULK_TIMEOUT
+    seconds map to an empty list.
+    """
+    global _lookup_pool
+    if _lookup_pool is None:
+        with _youtube_lock:
+            if _lookup_pool is None:
+                _lookup_pool = ThreadPoolExecutor(
+                    max_workers=settings.YOUTUBE_MAX_CONCURRENCY, thread_name_prefix='youtube'
+                )
+
+    results = {}
+    futures = {}
+    for skill in dict.fromkeys(skills):
+        cached = get_cached_courses(skill, max_results)
+        if cached is not None:
+            results[skill] = cached
+        else:
+            # Pool threads only call the API; cache reads and writes stay on
+            # this thread and its database connection.
+            futures[skill] = _lookup_pool.submit(_search_youtube, skill, max_results)
+    wait(futures.values(), timeout=settings.YOUTUBE_BULK_TIMEOUT)
+
+    for skill, future in futures.items():
+        if future.done():
+            found = future.result()
+            if found is not None:
+                cache_courses(skill, max_results, found)
+            results[skill] = found or []
+        else:
+            future.cancel()
+            print(f"Timed out fetching YouTube courses for '{skill}'")
+            results[skill] = []
+    return results
+
+
+def _parse_search_response(response):
+    results = []
+    for item in response.get('items', []):
+        video_id = item.get('id', {}).get('videoId')
+        snippet = item.get('snippet', {})
+        if video_id and snippet:
+            results.append({
+                "name": snippet.get('title', 'Untitled Video'),
+                "url": f"https://www.youtube.com/watch?v={video_id}"
+            })
+    return results
\ No newline at end of file
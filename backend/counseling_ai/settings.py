@@ -1,6 +1,7 @@
 from pathlib import Path
 import environ
 import os
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -40,7 +41,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
-    'corsheaders.middleware.CorsMiddleware', # Must be high up
+    # First, so every response, including 429/503 from load shedding, gets
+    # the CORS headers browsers need to read it.
+    'corsheaders.middleware.CorsMiddleware',
+    'api.middleware.ServerTimingMiddleware', # Times the rest of the request
+    'api.middleware.AdmissionControlMiddleware', # Sheds LLM-bound requests under load
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,17 +74,54 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'counseling_ai.wsgi.application'
+ASGI_APPLICATION = 'counseling_ai.asgi.application'
+
+# Serve the LLM-bound endpoints with async views. Only enable this when running
+# under an ASGI server (e.g. `uvicorn counseling_ai.asgi:application`).
+USE_ASYNC_VIEWS = env.bool('USE_ASYNC_VIEWS', default=False)
+
+# Admission control for the LLM-bound endpoints (see api/admission.py), per
+# process: requests running at once, requests allowed to wait, and how long
+# they may wait (seconds) before getting a 503.
+ADMISSION_CONTROL_ENABLED = env.bool('ADMISSION_CONTROL_ENABLED', default=True)
+ADMISSION_MAX_IN_FLIGHT = env.int('ADMISSION_MAX_IN_FLIGHT', default=8)
+ADMISSION_MAX_QUEUE = env.int('ADMISSION_MAX_QUEUE', default=16)
+ADMISSION_QUEUE_TIMEOUT = env.float('ADMISSION_QUEUE_TIMEOUT', default=5.0)
 
 
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# DATABASE_URL selects the database; the default is SQLite next to this file.
+# SQLite runs in WAL mode (readers don't block the writer), waits up to
+# SQLITE_BUSY_TIMEOUT seconds for the write lock, and starts transactions
+# with BEGIN IMMEDIATE so a transaction that reads before writing can't fail
+# with "database is locked" when it upgrades its lock.
+SQLITE_OPTIONS = {
+    'timeout': env.int('SQLITE_BUSY_TIMEOUT', default=20),
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': 'PRAGMA journal_mode=WAL; PRAGMA synchronous=NORMAL; PRAGMA temp_store=MEMORY',
+}
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': env.db_url('DATABASE_URL', default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
 }
+# Keep connections open between requests (checked before reuse) instead of
+# opening one per request.
+DATABASES['default']['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=60)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['OPTIONS'] = {**SQLITE_OPTIONS, **DATABASES['default'].get('OPTIONS', {})}
+
+# Optional read replica, used by the chat history and roadmap endpoints (see
+# api/db_router.py).
+if env('DATABASE_REPLICA_URL', default=''):
+    DATABASES['replica'] = env.db_url('DATABASE_REPLICA_URL')
+    DATABASES['replica']['CONN_MAX_AGE'] = DATABASES['default']['CONN_MAX_AGE']
+    DATABASES['replica']['CONN_HEALTH_CHECKS'] = True
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['api.db_router.ReadReplicaRouter']
 
 
 # Password validation
@@ -120,6 +162,36 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Vector indexes built from uploaded resumes, one directory per content hash.
+RESUME_INDEX_ROOT = env('RESUME_INDEX_ROOT', default=os.path.join(BASE_DIR, 'resume_indexes'))
+# Memory budget for loaded resume indexes kept in each worker (LRU evicted).
+RESUME_INDEX_CACHE_BYTES = env.int('RESUME_INDEX_CACHE_BYTES', default=64 * 1024 * 1024)
+# 'per_resume' keeps a FAISS index directory per resume. 'shared' puts every
+# resume's chunks in one memory-mapped store under RESUME_SHARED_INDEX_ROOT
+# (see api/shared_index.py); compact it with `manage.py compact_resume_index`.
+RESUME_INDEX_MODE = env('RESUME_INDEX_MODE', default='per_resume')
+RESUME_SHARED_INDEX_ROOT = env('RESUME_SHARED_INDEX_ROOT', default=os.path.join(BASE_DIR, 'resume_index_shared'))
+
+# Resume uploads: the largest file accepted, and limits on text extraction
+# (pages read, bytes of text kept, seconds spent, and the address space of the
+# extraction process; 0 disables the memory limit). Resume files are always
+# streamed to a temporary file (see api/uploads.py); other uploads above
+# FILE_UPLOAD_MAX_MEMORY_SIZE are too.
+RESUME_MAX_UPLOAD_BYTES = env.int('RESUME_MAX_UPLOAD_BYTES', default=5 * 1024 * 1024)
+RESUME_MAX_PAGES = env.int('RESUME_MAX_PAGES', default=10)
+RESUME_MAX_TEXT_BYTES = env.int('RESUME_MAX_TEXT_BYTES', default=100 * 1024)
+RESUME_EXTRACT_TIMEOUT = env.float('RESUME_EXTRACT_TIMEOUT', default=10.0)
+RESUME_EXTRACT_MAX_MEMORY_BYTES = env.int('RESUME_EXTRACT_MAX_MEMORY_BYTES', default=512 * 1024 * 1024)
+FILE_UPLOAD_MAX_MEMORY_SIZE = env.int('FILE_UPLOAD_MAX_MEMORY_SIZE', default=1024 * 1024)
+
+# Lifecycle manager (`manage.py run_lifecycle`, see api/lifecycle.py):
+# sessions idle this many days are archived, resume files and indexes are
+# kept under RESUME_DISK_QUOTA_BYTES (0 for no quota), and rows are
+# processed LIFECYCLE_BATCH_SIZE at a time.
+SESSION_ARCHIVE_AFTER_DAYS = env.int('SESSION_ARCHIVE_AFTER_DAYS', default=90)
+RESUME_DISK_QUOTA_BYTES = env.int('RESUME_DISK_QUOTA_BYTES', default=2 * 1024 * 1024 * 1024)
+LIFECYCLE_BATCH_SIZE = env.int('LIFECYCLE_BATCH_SIZE', default=200)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -131,6 +203,95 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:3000",
 ]
 CORS_ALLOW_CREDENTIALS = True
+# Response headers cross-origin clients may read: the backoff sent with 429/503
+# and with a pending roadmap, and the chat history's ETag for If-None-Match.
+CORS_EXPOSE_HEADERS = ['Retry-After', 'ETag']
+
+# Prompt size limits, in (estimated) tokens, for each section of a chat prompt.
+PROMPT_HISTORY_TOKENS = env.int('PROMPT_HISTORY_TOKENS', default=1500)
+PROMPT_RESUME_TOKENS = env.int('PROMPT_RESUME_TOKENS', default=500)
+PROMPT_PROFILE_TOKENS = env.int('PROMPT_PROFILE_TOKENS', default=100)
+
+# Conversation history compaction: the last HISTORY_RECENT_MESSAGES messages
+# are always sent verbatim; older ones are folded into a running summary once
+# they add up to HISTORY_SUMMARY_TRIGGER_TOKENS.
+HISTORY_RECENT_MESSAGES = env.int('HISTORY_RECENT_MESSAGES', default=6)
+HISTORY_SUMMARY_TRIGGER_TOKENS = env.int('HISTORY_SUMMARY_TRIGGER_TOKENS', default=600)
+HISTORY_SUMMARY_MAX_TOKENS = env.int('HISTORY_SUMMARY_MAX_TOKENS', default=250)
+
+# Chat history pages: default and largest allowed `?limit=`.
+CHAT_HISTORY_PAGE_SIZE = env.int('CHAT_HISTORY_PAGE_SIZE', default=100)
+CHAT_HISTORY_MAX_PAGE_SIZE = env.int('CHAT_HISTORY_MAX_PAGE_SIZE', default=500)
+
+# Roadmap job queue (`manage.py run_roadmap_worker`): attempts per job, base
+# retry delay in seconds (doubled on each retry), and how long a running job
+# may go without finishing before another worker reclaims it.
+ROADMAP_JOB_MAX_ATTEMPTS = env.int('ROADMAP_JOB_MAX_ATTEMPTS', default=3)
+ROADMAP_JOB_RETRY_DELAY = env.int('ROADMAP_JOB_RETRY_DELAY', default=10)
+ROADMAP_JOB_LOCK_TIMEOUT = env.int('ROADMAP_JOB_LOCK_TIMEOUT', default=300)
+# Long-polling of the roadmap endpoint (async views only): longest allowed
+# `?wait=` and how often a waiting request re-checks the job. The sync view
+# answers at once and asks clients to retry after the poll interval.
+ROADMAP_MAX_WAIT = env.float('ROADMAP_MAX_WAIT', default=25.0)
+ROADMAP_POLL_INTERVAL = env.float('ROADMAP_POLL_INTERVAL', default=1.0)
+
+# Load the embedding model when the WSGI module is imported. Combined with a
+# pre-fork server's preload option (e.g. `gunicorn --preload`), the model is
+# loaded once in the master and shared copy-on-write by every worker.
+PRELOAD_MODELS = env.bool('PRELOAD_MODELS', default=False)
+
+# Unix socket of the shared embedding service (`manage.py run_embedding_server`).
+# When empty, each worker loads its own copy of the embedding model.
+EMBEDDING_SERVICE_SOCKET = env('EMBEDDING_SERVICE_SOCKET', default='')
+# Query embeddings kept per worker (LRU); chunk embeddings are cached in the
+# chunk_embeddings table.
+QUERY_EMBEDDING_CACHE_SIZE = env.int('QUERY_EMBEDDING_CACHE_SIZE', default=2048)
+
+# Groq response cache (see api/llm_cache.py). Takes any django-environ cache
+# URL: the default keeps responses per process; dbcache://llm_response_cache
+# (after `manage.py createcachetable`) or redis:// share them between workers.
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'llm': env.cache_url('LLM_CACHE_URL', default='locmemcache://llm-responses'),
+}
+LLM_CACHE_TTL = env.int('LLM_CACHE_TTL', default=24 * 3600)
+# Where welcome messages come from: 'llm' generates one per status and age
+# (cached, with the user's name filled in afterwards); 'template' uses fixed
+# text and makes no Groq call at all.
+WELCOME_MESSAGE_SOURCE = env('WELCOME_MESSAGE_SOURCE', default='llm')
+# How uploaded resumes are profiled (summary, skills, education, experience):
+# 'llm' asks Groq once per distinct resume, falling back to 'local' when Groq
+# is unavailable; 'local' reads the resume's section headings.
+RESUME_PROFILE_SOURCE = env('RESUME_PROFILE_SOURCE', default='llm')
+
+# Serve Prometheus metrics at /metrics. Keep the path off the public internet
+# (e.g. only route it from the internal network at the proxy).
+METRICS_ENABLED = env.bool('METRICS_ENABLED', default=True)
 
 YOUTUBE_API_KEY = env('YOUTUBE_API_KEY')
-GROQ_API_KEY = env('GROQ_API_KEY')
\ No newline at end of file
+GROQ_API_KEY = env('GROQ_API_KEY')
+# Groq calls (see api/groq_client.py): the deadline for one call including
+# retries, retry count and base backoff, connection pool size, and the
+# account's rate limits, shared by all workers on a host through
+# GROQ_RATE_LIMIT_FILE. A limit of 0 disables that bucket.
+GROQ_TIMEOUT = env.float('GROQ_TIMEOUT', default=30.0)
+GROQ_MAX_RETRIES = env.int('GROQ_MAX_RETRIES', default=4)
+GROQ_RETRY_BASE_DELAY = env.float('GROQ_RETRY_BASE_DELAY', default=0.5)
+GROQ_MAX_CONNECTIONS = env.int('GROQ_MAX_CONNECTIONS', default=20)
+GROQ_REQUESTS_PER_MINUTE = env.int('GROQ_REQUESTS_PER_MINUTE', default=30)
+GROQ_TOKENS_PER_MINUTE = env.int('GROQ_TOKENS_PER_MINUTE', default=6000)
+GROQ_RATE_LIMIT_FILE = env('GROQ_RATE_LIMIT_FILE', default=os.path.join(tempfile.gettempdir(), 'visiontrack-groq-ratelimit.json'))
+# Alternative API roots, e.g. the local stand-ins from `manage.py run_fake_upstreams`
+# used for load testing. Empty means the real services.
+GROQ_BASE_URL = env('GROQ_BASE_URL', default='')
+YOUTUBE_API_ENDPOINT = env('YOUTUBE_API_ENDPOINT', default='')
+# Course lookups: per-request socket timeout, how many run at once per process,
+# and the overall deadline for all lookups of one roadmap.
+YOUTUBE_REQUEST_TIMEOUT = env.float('YOUTUBE_REQUEST_TIMEOUT', default=5.0)
+YOUTUBE_MAX_CONCURRENCY = env.int('YOUTUBE_MAX_CONCURRENCY', default=9)
+YOUTUBE_BULK_TIMEOUT = env.float('YOUTUBE_BULK_TIMEOUT', default=8.0)
+# Course lookup cache: lifetime of found and of empty results (seconds), and
+# the size of each worker's in-memory tier in front of the shared table.
+YOUTUBE_CACHE_TTL = env.int('YOUTUBE_CACHE_TTL', default=7 * 24 * 3600)
+YOUTUBE_CACHE_NEGATIVE_TTL = env.int('YOUTUBE_CACHE_NEGATIVE_TTL', default=3600)
+YOUTUBE_CACHE_MEMORY_ENTRIES = env.int('YOUTUBE_CACHE_MEMORY_ENTRIES', default=1024)
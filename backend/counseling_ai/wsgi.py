@@ -5,3 +5,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'counseling_ai.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings
+
+if settings.PRELOAD_MODELS:
+    from api.llm_engine import warm_up
+    warm_up()
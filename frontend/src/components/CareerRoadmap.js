@@ -2,13 +2,24 @@ import React, { useState, useEffect } from 'react';
 import { Menu, User } from 'lucide-react'; 
 import { ReactComponent as MyLogo } from '../assets/my-logo.svg';
 
-// Helper function to fetch data from your API
+// Helper function to fetch data from your API. The roadmap is generated in the
+// background, so while it is pending (202) we poll. With async views the server
+// holds each request up to 25 seconds until the roadmap is ready; otherwise it
+// answers at once and we wait the Retry-After it sends before asking again.
 async function fetchRoadmapData(sessionId) {
-    const response = await fetch(`/api/roadmap/${sessionId}/`);
-    if (!response.ok) {
-        throw new Error('Failed to fetch roadmap data.');
+    while (true) {
+        const response = await fetch(`/api/roadmap/${sessionId}/?wait=25`);
+        if (!response.ok) {
+            throw new Error('Failed to fetch roadmap data.');
+        }
+        if (response.status !== 202) {
+            return response.json();
+        }
+        const retryAfter = Number(response.headers.get('Retry-After')) || 0;
+        if (retryAfter > 0) {
+            await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+        }
     }
-    return response.json();
 }
 
 // A single card component to display a career option
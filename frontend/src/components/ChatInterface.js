@@ -1,9 +1,12 @@
 import React, { useState, useEffect, useRef } from 'react';
-import { getChatHistory, sendMessage, uploadResume } from '../services/api';
+import { getChatHistory, getNewChatMessages, sendMessageStream, uploadResume } from '../services/api';
 import { Menu, User, Send, Mic, Paperclip } from 'lucide-react';
 import counselorAvatar from '../assets/avatar.png';
 import { ReactComponent as MyLogo } from '../assets/my-logo.svg';
 
+// How often the chat checks for messages saved elsewhere (another tab).
+const HISTORY_POLL_INTERVAL_MS = 15000;
+
 // This component uses YOUR original logic with the NEW design.
 const ChatInterface = ({ sessionData, onNavigateToRoadmap }) => {
   const [messages, setMessages] = useState([]);
@@ -14,10 +17,59 @@ const ChatInterface = ({ sessionData, onNavigateToRoadmap }) => {
   const inputRef = useRef(null);
   const [selectedFile, setSelectedFile] = useState(null);
   const fileInputRef = useRef(null);
+  // Cursor of the newest message we have and the ETag of the last poll, so
+  // refreshes fetch only new messages and an unchanged history costs a 304.
+  const afterCursorRef = useRef(null);
+  const etagRef = useRef(null);
+  // Set while a message is being sent, so a poll can't race the reply.
+  const sendingRef = useRef(false);
 
   const sessionId = sessionData?.session_id;
 
-  // Your original useEffect for loading chat history - NO CHANGES
+  // Adds messages saved on the server that we don't show yet. A user message
+  // replaces the optimistic copy we added when it was sent.
+  const mergeMessages = (prev, incoming) => {
+    const merged = [...prev];
+    incoming.forEach(message => {
+      if (merged.some(msg => msg.message_id === message.message_id)) return;
+      const localIndex = message.sender === 'user'
+        ? merged.findIndex(msg => msg.local && msg.sender === 'user' && msg.message === message.message)
+        : -1;
+      if (localIndex !== -1) {
+        merged[localIndex] = message;
+      } else {
+        merged.push(message);
+      }
+    });
+    return merged;
+  };
+
+  const refreshHistory = async () => {
+    if (!sessionId || !afterCursorRef.current || sendingRef.current) return;
+    try {
+      let hasMore = true;
+      while (hasMore) {
+        const result = await getNewChatMessages(sessionId, afterCursorRef.current, etagRef.current);
+        if (!result) return; // 304: nothing new
+        const { page, etag } = result;
+        if (page.after_cursor !== afterCursorRef.current) {
+          afterCursorRef.current = page.after_cursor;
+          // The ETag belongs to the old cursor's query.
+          etagRef.current = null;
+        } else {
+          etagRef.current = etag;
+        }
+        if (page.messages?.length) {
+          setMessages(prev => mergeMessages(prev, page.messages));
+        }
+        hasMore = page.has_more;
+      }
+    } catch (error) {
+      console.error('Error refreshing chat history:', error);
+    }
+  };
+
+  // Your original useEffect for loading chat history
   useEffect(() => {
     const loadChatHistory = async () => {
       if (!sessionId) {
@@ -29,6 +81,8 @@ const ChatInterface = ({ sessionData, onNavigateToRoadmap }) => {
         const response = await getChatHistory(sessionId);
         if (response && response.messages) {
           setMessages(response.messages);
+          afterCursorRef.current = response.after_cursor;
+          etagRef.current = null;
         }
       } catch (error) {
         console.error('Error fetching chat history:', error);
@@ -41,6 +95,15 @@ const ChatInterface = ({ sessionData, onNavigateToRoadmap }) => {
     loadChatHistory();
   }, [sessionId]);
 
+  // Poll for new messages while the tab is visible.
+  useEffect(() => {
+    const interval = setInterval(() => {
+      if (document.visibilityState === 'visible') refreshHistory();
+    }, HISTORY_POLL_INTERVAL_MS);
+    return () => clearInterval(interval);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [sessionId]);
+
   // Your original auto-scroll logic - NO CHANGES
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -50,6 +113,7 @@ const ChatInterface = ({ sessionData, onNavigateToRoadmap }) => {
   const handleSendMessage = async () => {
     // Prevent sending if the AI is already typing or there's no valid input.
     if (isTyping || (!inputMessage.trim() && !selectedFile) || !sessionId) return;
+    sendingRef.current = true;
 
     // --- LOGIC FOR HANDLING FILE UPLOADS (NOW CORRECTED) ---
     if (selectedFile) {
@@ -68,7 +132,8 @@ const ChatInterface = ({ sessionData, onNavigateToRoadmap }) => {
           message_id: `user_file_${Date.now()}`,
           message: `You sent a file: ${file.name}`,
           sender: 'user',
-          timestamp: new Date().toISOString()
+          timestamp: new Date().toISOString(),
+          local: true
         };
         
         // The backend's 'upload_resume' view should return the AI's response.
@@ -92,6 +157,8 @@ const ChatInterface = ({ sessionData, onNavigateToRoadmap }) => {
         setInputMessage('');
         setIsTyping(false);
         inputRef.current?.focus();
+        sendingRef.current = false;
+        refreshHistory();
       }
 
     // --- LOGIC FOR HANDLING TEXT MESSAGES (YOUR ORIGINAL CODE, UNCHANGED) ---
@@ -100,7 +167,9 @@ const ChatInterface = ({ sessionData, onNavigateToRoadmap }) => {
         message_id: `user_${Date.now()}`,
         message: inputMessage,
         sender: 'user',
-        timestamp: new Date().toISOString()
+        timestamp: new Date().toISOString(),
+        // Shown until the saved copy arrives with the next history refresh.
+        local: true
       };
       
       setMessages(prev => [...prev, userMessage]);
@@ -108,10 +177,22 @@ const ChatInterface = ({ sessionData, onNavigateToRoadmap }) => {
       setInputMessage('');
       setIsTyping(true);
 
+      // Placeholder for the AI reply, filled in as tokens stream in.
+      const streamingId = `ai_stream_${Date.now()}`;
       try {
-        const response = await sendMessage(currentInput, sessionId);
+        const response = await sendMessageStream(currentInput, sessionId, (token) => {
+          setIsTyping(false);
+          setMessages(prev => {
+            const existing = prev.find(msg => msg.message_id === streamingId);
+            if (existing) {
+              return prev.map(msg => msg.message_id === streamingId ? { ...msg, message: msg.message + token } : msg);
+            }
+            return [...prev, { message_id: streamingId, message: token, sender: 'ai', timestamp: new Date().toISOString() }];
+          });
+        });
         if (response.success && response.ai_response) {
-          setMessages(prev => [...prev, response.ai_response]);
+          // Swap the placeholder for the saved message.
+          setMessages(prev => mergeMessages(prev.filter(msg => msg.message_id !== streamingId), [response.ai_response]));
           
         } else {
           throw new Error("Invalid AI response from backend.");
@@ -119,10 +200,13 @@ const ChatInterface = ({ sessionData, onNavigateToRoadmap }) => {
       } catch (error) {
         console.error('Error sending message:', error);
         const errorMessage = { message_id: `err_${Date.now()}`, message: "I'm sorry, an error occurred. Please try again.", sender: 'ai', timestamp: new Date().toISOString() };
-        setMessages(prev => [...prev, errorMessage]);
+        setMessages(prev => [...prev.filter(msg => msg.message_id !== streamingId), errorMessage]);
       } finally {
         setIsTyping(false);
         inputRef.current?.focus();
+        sendingRef.current = false;
+        // Picks up the saved copy of the user's message.
+        refreshHistory();
       }
     }
   };
@@ -46,8 +46,75 @@ export const sendMessage = async (message, sessionId) => {
   });
 };
 
-export const getChatHistory = async (sessionId) => {
-  return makeRequest(`/get_chat_history/${sessionId}/`);
+// Streams the AI reply as Server-Sent Events. `onToken` is called with each
+// piece of text as it arrives; the promise resolves with the final response,
+// shaped like sendMessage's ({ success, ai_response }).
+export const sendMessageStream = async (message, sessionId, onToken) => {
+  const response = await fetch(`${API_BASE_URL}/send_message/stream/`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ message: message, session_id: sessionId }),
+  });
+  if (!response.ok || !response.body) {
+    throw new Error(`Streaming request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    // Events are separated by a blank line.
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      const event = rawEvent.match(/^event: (.*)$/m)?.[1];
+      const data = JSON.parse(rawEvent.match(/^data: (.*)$/m)?.[1] || '{}');
+      if (event === 'token') {
+        onToken(data.text);
+      } else if (event === 'done') {
+        result = data;
+      } else if (event === 'error') {
+        throw data;
+      }
+    }
+  }
+  if (!result) {
+    throw new Error('Stream ended before the AI response was complete.');
+  }
+  return result;
+};
+
+// `params` may hold `limit`, `before` or `after` cursors from a previous page,
+// e.g. getChatHistory(id, { after: page.after_cursor }) fetches only new messages.
+export const getChatHistory = async (sessionId, params = {}) => {
+  const query = new URLSearchParams(params).toString();
+  return makeRequest(`/get_chat_history/${sessionId}/${query ? `?${query}` : ''}`);
+};
+
+// Fetches the messages saved after `afterCursor`. The ETag of the previous
+// poll is sent as If-None-Match, so when nothing is new the server answers
+// 304 without reading the history; this resolves with null then. Otherwise it
+// resolves with { page, etag }, where page is shaped like getChatHistory's.
+export const getNewChatMessages = async (sessionId, afterCursor, etag) => {
+  const query = new URLSearchParams({ after: afterCursor }).toString();
+  const response = await fetch(`${API_BASE_URL}/get_chat_history/${sessionId}/?${query}`, {
+    // Revalidate ourselves rather than letting the browser cache answer.
+    cache: 'no-store',
+    headers: etag ? { 'If-None-Match': etag } : {},
+  });
+  if (response.status === 304) {
+    return null;
+  }
+  if (!response.ok) {
+    throw new Error(`History request failed with status ${response.status}`);
+  }
+  return { page: await response.json(), etag: response.headers.get('ETag') };
 };
 
 export const uploadResume = async (file, sessionId) => {